@@ -0,0 +1,89 @@
+"""Benchmark for DsOptions.cull_with_dates.
+Compares culling through lists of DsToken objects (one list per date, the
+way culling used to work) against the span-based path, with and without the
+shape cache, and against the bitmask and regex engines. Besides the time per date, reports how many DsToken objects
+each run created, since those are the short-lived objects the span-based
+path exists to avoid. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_cull.py
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from datesense import DsOptions
+from datesense.dsengines import BitmaskEngine, RegexEngine
+from datesense.dstoken import DsToken
+
+
+def create_options(shape_cache_size):
+    return DsOptions(DsOptions.get_default_rules(), DsOptions.get_default_num_options(),
+                     DsOptions.get_default_word_options(), DsOptions.get_default_tz_offset_directive(),
+                     shape_cache_size)
+
+
+def generate_dates(count, date_format='%Y-%m-%d %H:%M:%S', seed=0):
+    rng = random.Random(seed)
+    start = datetime(2000, 1, 1)
+    return [(start + timedelta(seconds=rng.randint(0, 10 ** 9))).strftime(date_format) for _ in range(count)]
+
+
+def cull_with_tokens(options, dates):
+    for date in dates:
+        options.cull_with_date_tokens(DsToken.tokenize_date(date))
+
+
+def cull_with_spans(options, dates):
+    options.cull_with_dates(dates)
+
+
+def count_tokens(cull, options, dates):
+    """Runs the cull and returns how many DsToken objects it created."""
+    created = [0]
+    token_init = DsToken.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[0] += 1
+        token_init(self, *args, **kwargs)
+
+    DsToken.__init__ = counting_init
+    try:
+        cull(options, dates)
+    finally:
+        DsToken.__init__ = token_init
+    return created[0]
+
+
+def cull_with_bitmasks(options, dates):
+    BitmaskEngine().cull(options, dates)
+
+
+def cull_with_regex(options, dates):
+    RegexEngine().cull(options, dates)
+
+
+def measure(cull, dates, shape_cache_size):
+    options = create_options(shape_cache_size)
+    options.init_with_date_tokens(DsToken.tokenize_date(dates[0]))
+    start = time.perf_counter()
+    cull(options, dates)
+    elapsed = time.perf_counter() - start
+    options = create_options(shape_cache_size)
+    options.init_with_date_tokens(DsToken.tokenize_date(dates[0]))
+    return elapsed / len(dates), count_tokens(cull, options, dates)
+
+
+def main(count=100000):
+    dates = generate_dates(count)
+    print('%-28s %12s %14s' % ('path', 'per date', 'DsTokens'))
+    for name, cull, shape_cache_size in (('DsToken lists', cull_with_tokens, 0),
+                                         ('spans', cull_with_spans, 0),
+                                         ('spans + shape cache', cull_with_spans, 256),
+                                         ('BitmaskEngine', cull_with_bitmasks, 256),
+                                         ('RegexEngine', cull_with_regex, 256)):
+        per_date, tokens = measure(cull, dates, shape_cache_size)
+        print('%-28s %10.2fus %14d' % (name, per_date * 1e6, tokens))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Benchmark for NumpyEngine.
+Times format detection for a column of identically-shaped timestamps with
+the default culling and with the numpy engine, and checks both detect the
+same format. Requires numpy. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_numpy_engine.py
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+import datesense
+from datesense.dsengines import NumpyEngine
+
+
+def generate_dates(count, date_format='%Y-%m-%dT%H:%M:%S', seed=0):
+    rng = random.Random(seed)
+    start = datetime(2000, 1, 1)
+    return [(start + timedelta(seconds=rng.randint(0, 10 ** 9))).strftime(date_format) for _ in range(count)]
+
+
+def main(count=1000000):
+    dates = generate_dates(count)
+    results = []
+    for name, engine in (('default', None), ('numpy', NumpyEngine())):
+        start = time.perf_counter()
+        options = datesense.detect_format(dates, engine=engine)
+        elapsed = time.perf_counter() - start
+        results.append(options.get_format_string())
+        print('%-10s %10.3fs  %s' % (name, elapsed, options))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
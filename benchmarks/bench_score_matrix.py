@@ -0,0 +1,58 @@
+"""Benchmark for DsScoreMatrix.
+Times scoring the token possibilities of long date strings with many
+tokens, like log lines holding several timestamps, with the DsToken
+objects and with a DsScoreMatrix, and checks both give the same scores.
+Requires numpy. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_score_matrix.py
+"""
+import copy
+import random
+import time
+from datetime import datetime, timedelta
+
+from datesense import DsOptions, DsScoreMatrix
+
+FORMATS = ('%Y-%m-%dT%H:%M:%S', '%a %b %d %H:%M:%S %Y', '%d/%m/%y %I:%M %p', '%A, %d. %B %Y', '%G-W%V-%u')
+
+
+def generate_dates(count, timestamps=24, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2000, 1, 1)
+    date_format = ' | '.join(FORMATS[i % len(FORMATS)] for i in range(timestamps))
+    return [(start + timedelta(seconds=rng.randint(0, 10 ** 9))).strftime(date_format) for _ in range(count)]
+
+
+def score(options, score_matrix):
+    if score_matrix:
+        DsScoreMatrix(options).process(options.format_rules)
+    else:
+        options.process()
+
+
+def main(count=200, repeat=20):
+    for timestamps in (4, 24, 96):
+        bench(count, timestamps, repeat)
+
+
+def bench(count, timestamps, repeat):
+    options = DsOptions(DsOptions.get_default_rules(), DsOptions.get_default_num_options(),
+                        DsOptions.get_default_word_options(), DsOptions.get_default_tz_offset_directive())
+    options.initialize(generate_dates(count, timestamps))
+    print('%d positions, %d possibilities' % (len(options.allowed), sum(len(tl) for tl in options.allowed)))
+    results = []
+    for name, score_matrix in (('objects', False), ('matrix', True)):
+        copies = [copy.deepcopy(options) for _ in range(repeat + 1)]
+        # Warm up, numpy imports some of its modules the first time they're used
+        score(copies.pop(), score_matrix)
+        start = time.perf_counter()
+        for scored in copies:
+            score(scored, score_matrix)
+        elapsed = (time.perf_counter() - start) / repeat
+        results.append([[tok.score for tok in token_list] for token_list in copies[0].allowed])
+        print('%-10s %10.2fms' % (name, elapsed * 1000))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark for DsToken.tokenize_date.
+Compares the pattern-based tokenizer against the original character-by-character
+implementation (kept here for reference) and checks that both produce the same
+token stream for every benchmarked date. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_tokenize.py
+"""
+import random
+import timeit
+
+from datesense.dstoken import DsToken
+
+
+def tokenize_date_reference(date_string):
+    """The original character-by-character tokenizer."""
+    current_text = ''
+    current_kind = -1
+    tokens = []
+    for char in date_string:
+        asc = ord(char)
+        is_digit = (48 <= asc <= 57)
+        is_alpha = (97 <= asc <= 122) or (65 <= asc <= 90)
+        is_tzoff = (43 == asc or asc == 45)
+        tokkind = DsToken.KIND_NUMBER * is_digit + DsToken.KIND_WORD * is_alpha + DsToken.KIND_TIMEZONE * is_tzoff
+        if tokkind == current_kind and current_kind != DsToken.KIND_TIMEZONE:
+            current_text += char
+        else:
+            if current_text:
+                tokens.append(DsToken(current_kind, current_text))
+            current_kind = tokkind
+            current_text = char
+    if current_text:
+        tokens.append(DsToken(current_kind, current_text))
+    ret_tokens = []
+    skip = False
+    tokens_count = len(tokens)
+    for i in range(0, tokens_count):
+        if skip:
+            skip = False
+        else:
+            tok = tokens[i]
+            if tok.is_timezone():
+                token_previous = tokens[i - 1] if (i > 0) else None
+                token_next = tokens[i + 1] if (i < tokens_count - 1) else None
+                check_prev = (not token_previous) or not (
+                        token_previous.is_number() or token_previous.is_timezone())
+                check_next = (token_next and token_next.is_number() and
+                              len(token_next.text) == DsToken.TIMEZONE_LENGTH)
+                if check_prev and check_next:
+                    tok.text += token_next.text
+                    skip = True
+                else:
+                    tok.kind = DsToken.KIND_DECORATOR
+            ret_tokens.append(tok)
+    return ret_tokens
+
+
+DATES = (
+    '2014-01-02 15:20:11',
+    '2013-04-15T14:04:11+0100',
+    'Mon Apr 15 14:04:11 2013',
+    '15 Dec 2014',
+    'Tue, 15 Apr 2013 14:04:11 -0300 (GMT-0300)',
+    'The day is 15, the month is April, the time is 02:04PM',
+)
+
+
+def stream(tokens):
+    return [(tok.kind, tok.text) for tok in tokens]
+
+
+def check_equivalence(count=5000, seed=0):
+    """Checks the tokenizers agree on the benchmarked dates and on random strings."""
+    rng = random.Random(seed)
+    alphabet = '0123456789+-+-aZ :,.\u00e9'
+    dates = list(DATES)
+    dates.extend(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 16))) for _ in range(count))
+    for date in dates:
+        assert stream(DsToken.tokenize_date(date)) == stream(tokenize_date_reference(date)), date
+
+
+def main(number=20000):
+    check_equivalence()
+    print('%-60s %12s %12s %8s' % ('date', 'reference', 'pattern', 'speedup'))
+    for date in DATES:
+        reference = timeit.timeit(lambda: tokenize_date_reference(date), number=number) / number
+        pattern = timeit.timeit(lambda: DsToken.tokenize_date(date), number=number) / number
+        print('%-60s %10.2fus %10.2fus %7.1fx' % (repr(date), reference * 1e6, pattern * 1e6, reference / pattern))
+
+
+if __name__ == '__main__':
+    main()
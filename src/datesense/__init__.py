@@ -9,18 +9,37 @@ the way the parser  works and what assumptions it's allowed to
 make regarding the formatting of its input, take a look at the
 documentation for DsOptions.py.
 """
+import sys
+
+from .dscheckpoint import DsCheckpoint
 from .dsoptions import DsOptions
+from .dspartialstate import DsPartialState
+from .dsreservoir import DsReservoir
 
 # datesense version
 __version__ = '1.1.0'
 
+if sys.version_info < (3, 7):
+    from .dsscorematrix import DsScoreMatrix
+
+
+def __getattr__(name):
+    # DsScoreMatrix is imported the first time it's used, since importing it imports numpy
+    if name == 'DsScoreMatrix':
+        from .dsscorematrix import DsScoreMatrix
+        return DsScoreMatrix
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 
-def detect_format(dates, format_rules=None, numeric_options=None, word_options=None, tz_offset_directive=None):
+def detect_format(dates, format_rules=None, numeric_options=None, word_options=None, tz_offset_directive=None,
+                  engine=None, early_exit=False, tolerance=None, time_budget=None, seed_scan=0, score_matrix=False):
     """Initialize and process everything for a data set in one convenient
     method. (Recommended you use this unless you're sure of what you're doing.)
     Returns a DsOptions object containing date format information.
 
     :param dates: A set of identically-formatted date strings for which the formatting should be detected.
+        The date strings may also be bytes, bytearray or memoryview objects. Any
+        iterable will do, like a generator or a file object; it's read only once.
     :param format_rules: (optional) A set of rule objects such as those
         found in dsrules, which inform the parser of what assumptions it
         should make regarding how input data will normally be formatted.
@@ -35,5 +54,75 @@ def detect_format(dates, format_rules=None, numeric_options=None, word_options=N
         are a special case - this string informs the parser of what
         directive to use for them. (You probably want this to be '%z'.)
         Defaults to the value returned by DsOptions.get_default_tz_offset_directive().
+    :param engine: (optional) An engine object such as those found in dsengines,
+        to cull token possibility data with. Defaults to None, meaning
+        DsOptions.cull_with_dates is used.
+    :param early_exit: (optional) If True, stop reading dates as soon as no
+        more dates could change the detected format. The dates_examined
+        attribute of the returned object tells how many were read. Can't be
+        used with an engine. Defaults to False.
+    :param tolerance: (optional) If not None, the fraction of date strings which
+        may disagree with a directive before it's ruled out, so that a few
+        malformed date strings don't spoil the result. The get_violating_rows
+        method of the returned object tells which rows disagreed. Defaults to None.
+    :param time_budget: (optional) If not None, the number of seconds to spend
+        reading dates, after which the format is detected from the dates read
+        so far. The partial attribute of the returned object is then True and
+        its dates_examined attribute tells how many were read. Can't be used
+        with an engine. Defaults to None.
+    :param seed_scan: (optional) If not 0, the number of date strings at the start
+        to pre-scan for the most common arrangement of tokens, which is then
+        detected instead of assuming the first date string is formatted like the
+        rest. Date strings arranged any other way are skipped, and the
+        dates_skipped attribute of the returned object counts them. Defaults to 0.
+    :param score_matrix: (optional) If True, score token possibilities in a numpy
+        array using DsScoreMatrix, which detects the same format and is faster for
+        date strings with many tokens. Requires numpy. Defaults to False.
+    """
+    return DsOptions.detect_format(dates, format_rules, numeric_options, word_options, tz_offset_directive, engine,
+                                   early_exit, tolerance, time_budget, seed_scan, score_matrix)
+
+
+def detect_format_stream(dates, format_rules=None, numeric_options=None, word_options=None, tz_offset_directive=None,
+                         reservoir=None, early_exit=False, tolerance=None, time_budget=None):
+    """Like detect_format, which also reads a stream of date strings such as
+    a generator or a file object only once and never holds it in memory all
+    at once, but also keeps a reservoir of representative date strings in
+    the reservoir attribute of the returned object.
+    Returns a DsOptions object containing date format information.
+
+    :param dates: An iterable of identically-formatted date strings.
+    :param format_rules: (optional) See detect_format.
+    :param numeric_options: (optional) See detect_format.
+    :param word_options: (optional) See detect_format.
+    :param tz_offset_directive: (optional) See detect_format.
+    :param reservoir: (optional) A DsReservoir object to keep representative
+        date strings in. Defaults to None, meaning a new one of the default size.
+    :param early_exit: (optional) See detect_format.
+    :param tolerance: (optional) See detect_format.
+    :param time_budget: (optional) See detect_format.
+    """
+    return DsOptions.detect_format_stream(dates, format_rules, numeric_options, word_options, tz_offset_directive,
+                                          reservoir, early_exit, tolerance, time_budget)
+
+
+def detect_formats(dates, format_rules=None, numeric_options=None, word_options=None, tz_offset_directive=None,
+                   max_formats=DsOptions.DEFAULT_MAX_FORMATS):
+    """Like detect_format, but for a set of date strings which mixes several
+    formats. The date strings are sorted by the kinds of their tokens and
+    the text between them in a single pass, and the format of each kind of
+    date string is detected separately.
+    Returns a tuple of a list of DsOptions objects, one for each format, and
+    an array('H') giving the index in that list of each date string's format.
+
+    :param dates: An iterable of date strings.
+    :param format_rules: (optional) See detect_format.
+    :param numeric_options: (optional) See detect_format.
+    :param word_options: (optional) See detect_format.
+    :param tz_offset_directive: (optional) See detect_format.
+    :param max_formats: (optional) The most formats to tell apart. Date strings
+        of any other format get the index DsOptions.UNKNOWN_FORMAT. Defaults to
+        DsOptions.DEFAULT_MAX_FORMATS.
     """
-    return DsOptions.detect_format(dates, format_rules, numeric_options, word_options, tz_offset_directive)
+    return DsOptions.detect_formats(dates, format_rules, numeric_options, word_options, tz_offset_directive,
+                                    max_formats)
@@ -0,0 +1,129 @@
+"""Contains DsCheckpoint class for DateSense package."""
+import json
+import os
+import tempfile
+from itertools import chain, islice
+
+from .dsoptions import DsOptions
+from .dspartialstate import DsPartialState
+from .dstoken import DsToken
+
+
+class DsCheckpoint(object):
+    """A DsCheckpoint object periodically saves the culling state for a
+    long stream of date strings to a file, along with how far into the
+    stream culling got, so that if the process dies it can resume from
+    there instead of starting over. The file is a small JSON document
+    holding a DsPartialState and the offset, and it's replaced atomically
+    so it's never seen half-written.
+    """
+
+    # Default number of date strings to cull with between checkpoints
+    DEFAULT_INTERVAL = 100000
+
+    def __init__(self, path, interval=DEFAULT_INTERVAL):
+        """Constructs a DsCheckpoint object.
+        Returns the DsCheckpoint object.
+
+        :param path: The path of the checkpoint file.
+        :param interval: (optional) How many date strings to cull with
+            between checkpoints. Defaults to DsCheckpoint.DEFAULT_INTERVAL.
+        """
+        self.path = path
+        self.interval = interval
+
+    def save(self, options, offset):
+        """Writes a checkpoint for a DsOptions object which has been culled
+        with, but not yet with cull_decorators.
+
+        :param options: The DsOptions object.
+        :param offset: How many date strings of the stream have been read.
+        """
+        data = {'offset': offset, 'state': DsPartialState.from_options(options).to_dict()}
+        # Write to a temporary file next to the checkpoint and then swap it in
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.datesense-', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as temp_file:
+                json.dump(data, temp_file, separators=(',', ':'))
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None):
+        """Reads the checkpoint file.
+        Returns a tuple of a DsOptions object with the culling state saved
+        in it and the offset into the stream to carry on from, or
+        (None, 0) if there's no checkpoint file.
+
+        :param format_rules: (optional) See DsOptions.detect_format.
+        :param num_options: (optional) See DsOptions.detect_format. Must be
+            the same as the checkpoint was made with.
+        :param word_options: (optional) See DsOptions.detect_format. Must be
+            the same as the checkpoint was made with.
+        :param tz_offset_directive: (optional) See DsOptions.detect_format.
+        """
+        try:
+            with open(self.path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None, 0
+        state = DsPartialState.from_dict(data['state'])
+        if state.is_empty():
+            return None, 0
+        return state.to_options(format_rules, num_options, word_options, tz_offset_directive), data['offset']
+
+    def cull(self, options, dates, offset):
+        """Culls token possibility data with the rest of a stream of date
+        strings, writing a checkpoint every interval date strings and once
+        the stream runs out.
+        Returns the offset at the end of the stream.
+
+        :param options: The DsOptions object to cull.
+        :param dates: An iterator over the rest of the stream.
+        :param offset: How many date strings of the stream were read before.
+        """
+        while True:
+            examined = options.dates_examined
+            options.cull_with_dates(islice(dates, self.interval))
+            offset += options.dates_examined - examined
+            self.save(options, offset)
+            if options.dates_examined - examined < self.interval:
+                return offset
+
+    def detect_format(self, dates, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None):
+        """Like DsOptions.detect_format for a stream of date strings, but
+        resuming from the checkpoint file if there is one, in which case
+        the date strings it already covered are skipped.
+        Returns a DsOptions object containing date format information.
+
+        :param dates: An iterable of identically-formatted date strings,
+            from the start of the stream.
+        :param format_rules: (optional) See DsOptions.detect_format.
+        :param num_options: (optional) See DsOptions.detect_format.
+        :param word_options: (optional) See DsOptions.detect_format.
+        :param tz_offset_directive: (optional) See DsOptions.detect_format.
+        """
+        format_rules = format_rules if format_rules else DsOptions.get_default_rules()
+        num_options = num_options if num_options else DsOptions.get_default_num_options()
+        word_options = word_options if word_options else DsOptions.get_default_word_options()
+        tz_offset_directive = tz_offset_directive if tz_offset_directive else DsOptions.get_default_tz_offset_directive()
+
+        dates = iter(dates)
+        options, offset = self.load(format_rules, num_options, word_options, tz_offset_directive)
+        if options:
+            # Skip the date strings the checkpoint covered
+            next(islice(dates, offset, offset), None)
+        else:
+            options = DsOptions(format_rules, num_options, word_options, tz_offset_directive)
+            first = next(dates, None)
+            if first is not None:
+                options.init_with_date_tokens(DsToken.tokenize_date(first))
+                dates = chain((first,), dates)
+        self.cull(options, dates, offset)
+        options.cull_decorators()
+        options.process()
+        return options
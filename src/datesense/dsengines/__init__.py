@@ -0,0 +1,4 @@
+from .bitmask_engine import BitmaskEngine
+from .numpy_engine import NumpyEngine
+from .regex_engine import RegexEngine
+from .sampling_engine import SamplingEngine
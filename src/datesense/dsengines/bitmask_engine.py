@@ -0,0 +1,65 @@
+from ..dstoken import DsToken
+
+
+class BitmaskEngine(object):
+    """The bitmask engine culls token possibility data by tracking which
+    possibilities survive at each position as an integer bitmask instead
+    of deleting DsToken objects from the allowed lists one date at a time.
+    Bit j of a position's mask stands for the possibility at index j of
+    that position's list. The first time a value is encountered at a
+    position, the mask of possibilities that allow it is worked out and
+    remembered, so culling a date is then a single AND per position. The
+    allowed lists are only rebuilt once, after all the dates are culled.
+    Engine objects are passed to DsOptions.detect_format or
+    DsOptions.initialize to be used in place of DsOptions.cull_with_dates.
+    """
+
+    def cull(self, options, dates, seed=None):
+        """Culls the token possibility data in a DsOptions object using a set
+        of date strings, the same as DsOptions.cull_with_dates would.
+        Raises ValueError if the DsOptions object is in tolerant mode,
+        since possibilities are discarded as soon as a value rules them out.
+
+        :param options: The DsOptions object to cull.
+        :param dates: A set of identically-formatted date strings.
+        :param seed: (optional) The date string the DsOptions object was
+            initialized with. Not needed, since every date string is culled
+            with, but accepted so the engine can be used by SamplingEngine.
+            Defaults to None.
+        """
+        if options.tolerance is not None:
+            raise ValueError("BitmaskEngine can't be used in tolerant mode")
+        allowed = options.allowed
+        positions = len(allowed)
+        masks = [(1 << len(token_list)) - 1 for token_list in allowed]
+        # Mask of the numeric possibilities at each position, for keeping track of num_ranges
+        number_masks = [sum(1 << j for j, tok in enumerate(token_list) if tok.is_number()) for token_list in allowed]
+        # Maps each value encountered at each position to the mask of possibilities allowing it
+        value_masks = [{} for _ in range(positions)]
+        get_spans = options.shape_cache.get_spans if options.shape_cache.max_size else DsToken.tokenize_spans
+
+        for date in dates:
+            # Token values have to be hashable, which slices of bytearray and memoryview objects aren't
+            if not isinstance(date, (str, bytes)):
+                date = bytes(date)
+            for i, (kind, start, end) in zip(range(positions), get_spans(date)):
+                if not masks[i]:
+                    continue
+                text = date[start:end]
+                value_mask = value_masks[i].get(text)
+                if value_mask is None:
+                    value_mask = value_masks[i][text] = options.get_value_mask(i, kind, text)
+                # Track the range of numbers encountered by any numeric possibility that allows them
+                if masks[i] & value_mask & number_masks[i]:
+                    number = int(text)
+                    num_range = options.num_ranges[i]
+                    if number < num_range[0]:
+                        num_range[0] = number
+                    if number > num_range[1]:
+                        num_range[1] = number
+                masks[i] &= value_mask
+            options.dates_examined += 1
+
+        # Rebuild the allowed lists from the masks
+        for i in range(0, positions):
+            options.allowed[i] = [tok for j, tok in enumerate(allowed[i]) if masks[i] >> j & 1]
@@ -0,0 +1,195 @@
+from ..dstoken import DsToken
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, it's only needed by this engine
+    numpy = None
+
+
+class NumpyEngine(object):
+    """The numpy engine culls token possibility data for columns of date
+    strings that are all the same length, like ISO 8601 timestamps or
+    syslog dates, using numpy arrays instead of tokenizing every date.
+    The date strings are viewed as 2D arrays of characters, one for each
+    length, so the kind of every character in every date can be worked out
+    at once. Dates of the same length whose characters are of the same
+    kinds are tokenized at the same offsets, so each token position of
+    such a group becomes a column slice of the array: numbers are converted
+    to integers all at once and only their lowest and highest values have
+    to be checked, against the ranges of every numeric possibility at once.
+    Only any distinct words and the first date differing from a group's
+    first date have to be checked one at a time. Dates which can't go in
+    the arrays, like empty ones or ones of another type than the first, are
+    culled the usual way by DsOptions.cull_with_dates, as are dates past the
+    first NumpyEngine.MAX_GROUPS shapes of each length.
+    Engine objects are passed to DsOptions.detect_format or
+    DsOptions.initialize to be used in place of DsOptions.cull_with_dates.
+    This engine requires numpy to be installed.
+    """
+
+    # Character classes used to compare the shape of dates
+    CLASS_OTHER = 0
+    CLASS_DIGIT = 1
+    CLASS_ALPHA = 2
+    CLASS_SIGN = 3
+
+    # Most groups of differently-shaped dates of each length to cull using arrays
+    MAX_GROUPS = 16
+
+    # Longest run of digits that can be converted to an integer without overflowing
+    MAX_DIGITS = 18
+
+    def __init__(self):
+        """Constructs a NumpyEngine object.
+        Returns the NumpyEngine object.
+        The vectorized_count and fallback_count attributes count the dates
+        the engine culled using arrays and the dates it passed on to
+        DsOptions.cull_with_dates.
+        """
+        if numpy is None:
+            raise ImportError('NumpyEngine requires numpy to be installed.')
+        self.vectorized_count = 0
+        self.fallback_count = 0
+
+    @staticmethod
+    def get_classes(codes):
+        """Returns an array with the character class of each character code in an array."""
+        table = numpy.zeros(128, dtype=numpy.int8)
+        table[48:58] = NumpyEngine.CLASS_DIGIT  # 0-9
+        table[65:91] = NumpyEngine.CLASS_ALPHA  # A-Z
+        table[97:123] = NumpyEngine.CLASS_ALPHA  # a-z
+        table[[43, 45]] = NumpyEngine.CLASS_SIGN  # +|-
+        # Anything outside ASCII is the same class as DEL, which is 127
+        if codes.dtype != numpy.uint8 or codes.max(initial=0) > 127:
+            codes = numpy.minimum(codes, 127)
+        return table[codes]
+
+    def cull(self, options, dates, seed=None):
+        """Culls the token possibility data in a DsOptions object using a set
+        of date strings, the same as DsOptions.cull_with_dates would. Unless
+        a seed is given, the first date string is taken to be the one the
+        DsOptions object was initialized with. Raises ValueError if the
+        DsOptions object is in tolerant mode, since only the lowest and
+        highest numbers are checked.
+
+        :param options: The DsOptions object to cull.
+        :param dates: A set of identically-formatted date strings.
+        :param seed: (optional) The date string the DsOptions object was
+            initialized with, for culling with a set that doesn't start
+            with it, like a sample. Defaults to None.
+        """
+        if options.tolerance is not None:
+            raise ValueError("NumpyEngine can't be used in tolerant mode")
+        dates = dates if isinstance(dates, (list, tuple)) else list(dates)
+        if not dates:
+            return
+        seed_type = type(dates[0] if seed is None else seed)
+        if seed_type is str:
+            dtype, code_dtype = 'U', numpy.uint32
+        elif seed_type is bytes:
+            dtype, code_dtype = 'S', numpy.uint8
+        else:
+            # Leave it to cull_with_dates if the dates can't go in an array
+            self.fallback_count += len(dates)
+            options.cull_with_dates(dates)
+            return
+
+        # Dates of the same length and character classes are tokenized at the same offsets, so they're culled
+        # together as a group. Dates of another type than the seed can't go in the same arrays.
+        fallback = []
+        lengths = numpy.fromiter((len(date) if type(date) is seed_type else 0 for date in dates),
+                                 dtype=numpy.intp, count=len(dates))
+        order = numpy.argsort(lengths, kind='stable')
+        widths, starts = numpy.unique(lengths[order], return_index=True)
+        for width, members in zip(widths.tolist(), numpy.split(order, starts[1:])):
+            if not width:
+                fallback.append(members)
+                continue
+            array = numpy.array([dates[i] for i in members.tolist()], dtype='%s%d' % (dtype, width))
+            codes = array.view(code_dtype).reshape(len(members), width)
+            classes = NumpyEngine.get_classes(codes)
+            rows = numpy.arange(len(members))
+            for group in range(0, NumpyEngine.MAX_GROUPS):
+                matches = (classes == classes[0]).all(axis=1)
+                if not self.cull_group(options, dates, members[rows[matches]], codes[matches]):
+                    fallback.append(members[rows[matches]])
+                if matches.all():
+                    break
+                others = ~matches
+                rows, codes, classes = rows[others], codes[others], classes[others]
+            else:
+                fallback.append(members[rows])
+
+        # Everything else is culled the usual way
+        if fallback:
+            fallback = [dates[i] for i in numpy.sort(numpy.concatenate(fallback)).tolist()]
+            self.fallback_count += len(fallback)
+            options.cull_with_dates(fallback)
+
+    def cull_group(self, options, dates, indexes, codes):
+        """Culls the token possibility data in a DsOptions object using a
+        group of date strings with the same length and character classes.
+        Returns False without culling if the group has numbers too long to
+        convert to integers, True otherwise.
+
+        :param options: The DsOptions object to cull.
+        :param dates: The set of date strings.
+        :param indexes: An array of the indexes in dates of the date strings
+            in the group.
+        :param codes: A 2D array of the character codes of the date strings
+            in the group.
+        """
+        first = dates[int(indexes[0])]
+        spans = DsToken.tokenize_spans(first)
+        if any(kind == DsToken.KIND_NUMBER and end - start > NumpyEngine.MAX_DIGITS for kind, start, end in spans):
+            return False
+        self.vectorized_count += len(indexes)
+        options.dates_examined += len(indexes)
+
+        for i in range(0, min(len(options.allowed), len(spans))):
+            if not options.allowed[i]:
+                continue
+            kind, start, end = spans[i]
+            column = codes[:, start:end]
+            # The first date's value rules out possibilities of the wrong kind, and any date whose text
+            # differs from it culls the decorator possibility
+            options.cull_with_value(i, kind, first[start:end])
+            differs = numpy.flatnonzero((column != column[0]).any(axis=1))
+            if len(differs):
+                options.cull_with_value(i, kind, dates[int(indexes[differs[0]])][start:end])
+            if kind == DsToken.KIND_NUMBER:
+                powers = 10 ** numpy.arange(end - start - 1, -1, -1, dtype=numpy.int64)
+                values = (column.astype(numpy.int64) - 48).dot(powers)
+                NumpyEngine.cull_numbers(options, i, int(values.min()), int(values.max()))
+            elif kind == DsToken.KIND_WORD:
+                word_dtype = '%s%d' % ('U' if column.dtype == numpy.uint32 else 'S', end - start)
+                words = numpy.unique(numpy.ascontiguousarray(column).view(word_dtype))
+                for word in words.tolist():
+                    options.cull_with_value(i, kind, word)
+        return True
+
+    @staticmethod
+    def cull_numbers(options, index, low, high):
+        """Culls the numeric possibilities for one position of the token
+        possibility data in a DsOptions object whose ranges don't contain
+        all the numbers between the lowest and highest found there, checking
+        every possibility's range at once, and tracks the range of numbers.
+
+        :param options: The DsOptions object to cull.
+        :param index: The position in the allowed attribute to cull.
+        :param low: The lowest number found at the position.
+        :param high: The highest number found at the position.
+        """
+        allowed_here = options.allowed[index]
+        numbers = [j for j, tok in enumerate(allowed_here) if tok.kind == DsToken.KIND_NUMBER]
+        if not numbers:
+            return
+        ranges = numpy.array([allowed_here[j].option.num_range for j in numbers], dtype=numpy.int64)
+        keep = (ranges[:, 0] <= low) & (high <= ranges[:, 1])
+        if keep.any():
+            num_range = options.num_ranges[index]
+            num_range[0] = min(num_range[0], low)
+            num_range[1] = max(num_range[1], high)
+        if not keep.all():
+            culled = set(numbers[j] for j in numpy.flatnonzero(~keep).tolist())
+            allowed_here[:] = [tok for j, tok in enumerate(allowed_here) if j not in culled]
@@ -0,0 +1,133 @@
+import re
+
+from ..dstoken import DsToken
+
+
+class RegexEngine(object):
+    """The regex engine culls token possibility data by compiling the
+    structure of the first date string into a regular expression and
+    matching every date string against it with a single fullmatch.
+    Each number, word and timezone offset gets a capture group, as do
+    decorators with anything besides the one decorator possibility left,
+    while decorators that can only be themselves must match literally. Only
+    the captured values are checked against the possibilities.
+    Unlike DsOptions.cull_with_dates, which compares date strings of a
+    different structure to the first one position by position for as many
+    positions as they have in common, date strings that don't match are
+    skipped. They're counted by the mismatched_count attribute, and the
+    first few of their indexes are listed by the mismatched_rows attribute.
+    Engine objects are passed to DsOptions.detect_format or
+    DsOptions.initialize to be used in place of DsOptions.cull_with_dates.
+    """
+
+    # Default number of mismatched date indexes to keep
+    MAX_MISMATCHED_ROWS = 100
+
+    # Patterns for capturing the value of each kind of token
+    KIND_PATTERNS = {
+        DsToken.KIND_NUMBER: '([0-9]+)',
+        DsToken.KIND_WORD: '([a-zA-Z]+)',
+        DsToken.KIND_TIMEZONE: '([+-][0-9]{%d})' % DsToken.TIMEZONE_LENGTH,
+    }
+    DECORATOR_PATTERN = '([^0-9a-zA-Z+-]+)'
+    SIGN_PATTERN = '([+-])'
+    # A lone '+' or '-' followed by the right number of digits would have been part of a timezone offset
+    NOT_TIMEZONE_PATTERN = '(?![0-9]{%d}(?![0-9]))' % DsToken.TIMEZONE_LENGTH
+
+    def __init__(self, max_mismatched_rows=MAX_MISMATCHED_ROWS):
+        """Constructs a RegexEngine object.
+        Returns the RegexEngine object.
+
+        :param max_mismatched_rows: (optional) The most indexes of date
+            strings that didn't match to list in the mismatched_rows
+            attribute. Defaults to RegexEngine.MAX_MISMATCHED_ROWS.
+        """
+        self.max_mismatched_rows = max_mismatched_rows
+        self.matched_count = 0
+        self.mismatched_count = 0
+        self.mismatched_rows = []
+
+    @staticmethod
+    def compile(options, seed):
+        """Compiles the structure of a date string into a regular expression.
+        Returns a tuple containing the compiled pattern and a list of
+        (index, kind) tuples, one for each capture group in the pattern,
+        giving the position in the allowed attribute the group's value
+        should cull and the DsToken kind of the value.
+
+        :param options: The DsOptions object whose possibilities the values
+            are going to be checked against.
+        :param seed: The date string the DsOptions object was initialized
+            with. May also be a bytes, bytearray or memoryview object.
+        """
+        is_text = isinstance(seed, str)
+        # Patterns for bytes are built as latin-1 text so every byte maps to exactly one character
+        seed_text = seed if is_text else bytes(seed).decode('latin-1')
+        parts = []
+        captures = []
+        previous_kind = None
+        for i, (kind, start, end) in enumerate(DsToken.iter_spans(seed_text)):
+            text = seed_text[start:end]
+            allowed_here = options.allowed[i] if i < len(options.allowed) else []
+            capture = True
+            if kind == DsToken.KIND_DECORATOR:
+                if len(allowed_here) == 1 and allowed_here[0].is_decorator() and allowed_here[0].text == text:
+                    # Nothing to check, so it only needs to match
+                    part = re.escape(text)
+                    capture = False
+                elif text in ('+', '-'):
+                    part = RegexEngine.SIGN_PATTERN
+                else:
+                    part = RegexEngine.DECORATOR_PATTERN
+                # Timezone offsets end in digits too, so a sign right after one is never part of another
+                if text in ('+', '-') and previous_kind not in (DsToken.KIND_NUMBER, DsToken.KIND_TIMEZONE):
+                    part += RegexEngine.NOT_TIMEZONE_PATTERN
+            else:
+                part = RegexEngine.KIND_PATTERNS[kind]
+            # Positions past the end of the allowed attribute have nothing left to cull
+            if capture and i < len(options.allowed):
+                captures.append((i, kind))
+            parts.append(part)
+            previous_kind = kind
+        pattern = ''.join(parts)
+        return re.compile(pattern if is_text else pattern.encode('latin-1')), captures
+
+    def cull(self, options, dates, seed=None):
+        """Culls the token possibility data in a DsOptions object using a set
+        of date strings. Unless a seed is given, the first date string is
+        taken to be the one the DsOptions object was initialized with.
+
+        :param options: The DsOptions object to cull.
+        :param dates: A set of identically-formatted date strings.
+        :param seed: (optional) The date string the DsOptions object was
+            initialized with, for culling with a set that doesn't start
+            with it, like a sample. Every date string in the set is then
+            culled with. Defaults to None.
+        """
+        dates = iter(dates)
+        first_row = 0
+        if seed is None:
+            for seed in dates:
+                break
+            else:
+                return
+            self.matched_count += 1
+            options.dates_examined += 1
+            first_row = 1
+        pattern, captures = RegexEngine.compile(options, seed)
+        fullmatch = pattern.fullmatch
+        allowed = options.allowed
+        for row, date in enumerate(dates, first_row):
+            match = fullmatch(date)
+            if match is None:
+                self.mismatched_count += 1
+                if len(self.mismatched_rows) < self.max_mismatched_rows:
+                    self.mismatched_rows.append(row)
+                options.dates_examined += 1
+                continue
+            self.matched_count += 1
+            for (i, kind), text in zip(captures, match.groups()):
+                if allowed[i]:
+                    options.cull_with_value(i, kind, text)
+            # In tolerant mode, violations are recorded against the number of dates examined before this one
+            options.dates_examined += 1
@@ -0,0 +1,185 @@
+import random
+
+
+class SamplingEngine(object):
+    """The sampling engine culls token possibility data using a random
+    sample of the date strings instead of all of them, for when the format
+    only needs to be known to some confidence.
+    Rows are sampled in rounds, each round twice the size of the one
+    before, until a round rules out no more possibilities and is large
+    enough to say with the requested confidence that no more than
+    max_violation_rate of all the rows would rule out any more, or until
+    max_size rows have been sampled.
+    Rows are picked either uniformly at random or, in stratified mode, by
+    dividing the rows into as many equal strata as the round has rows and
+    picking one at random from each, which guarantees the sample is spread
+    across the whole set. Picks are reproducible for a given seed.
+    After culling, the attributes sampled_count, total_count, rounds,
+    stable and violation_bound describe the evidence the result rests on:
+    violation_bound is the upper bound, at the requested confidence, on the
+    fraction of rows that would have ruled out more possibilities, based
+    on the last round. (It's None if no round was left unchanged.)
+    Engine objects are passed to DsOptions.detect_format or
+    DsOptions.initialize to be used in place of DsOptions.cull_with_dates.
+    """
+
+    # Consts for the sampling modes
+    UNIFORM = 'uniform'
+    STRATIFIED = 'stratified'
+
+    def __init__(self, mode=UNIFORM, seed=0, initial_size=256, max_size=65536, confidence=0.95,
+                 max_violation_rate=0.01, engine=None):
+        """Constructs a SamplingEngine object.
+        Returns the SamplingEngine object.
+
+        :param mode: (optional) How to pick rows, either
+            SamplingEngine.UNIFORM or SamplingEngine.STRATIFIED. Defaults to
+            SamplingEngine.UNIFORM.
+        :param seed: (optional) Seed for the random picks. Defaults to 0.
+        :param initial_size: (optional) Number of rows in the first round.
+            Defaults to 256.
+        :param max_size: (optional) The most rows to sample altogether.
+            Defaults to 65536.
+        :param confidence: (optional) Confidence the violation_bound holds
+            with. Defaults to 0.95.
+        :param max_violation_rate: (optional) Sampling stops once a round
+            changes nothing and shows, at the requested confidence, that no
+            more than this fraction of rows would. Defaults to 0.01.
+        :param engine: (optional) Another engine object to cull each round
+            with. Its cull method is passed the seed as a keyword argument.
+            Defaults to None, meaning DsOptions.cull_with_dates.
+        """
+        self.mode = mode
+        self.seed = seed
+        self.initial_size = initial_size
+        self.max_size = max_size
+        self.confidence = confidence
+        self.max_violation_rate = max_violation_rate
+        self.engine = engine
+        self.sampled_count = 0
+        self.total_count = 0
+        self.rounds = 0
+        self.stable = False
+        self.violation_bound = None
+
+    @staticmethod
+    def get_state(options):
+        """Returns what culling can change in a DsOptions object, for telling
+        whether a round of sampling changed anything.
+
+        :param options: The DsOptions object.
+        """
+        return ([len(token_list) for token_list in options.allowed],
+                [tuple(num_range) if num_range else None for num_range in options.num_ranges])
+
+    @staticmethod
+    def map_violating_rows(options, first_examined, examined):
+        """Replaces the rows recorded as violating possibilities in a DsOptions
+        object in tolerant mode, which count the date strings examined, with
+        the rows of the full set of date strings they were sampled from.
+
+        :param options: The DsOptions object.
+        :param first_examined: The number of date strings the DsOptions
+            object had examined before sampling.
+        :param examined: A list of the sampled rows, in the order they were
+            culled with.
+        """
+        for violating_rows in options.violating_rows:
+            for rows in violating_rows.values():
+                rows[:] = [examined[row - first_examined] if 0 <= row - first_examined < len(examined) else row
+                           for row in rows]
+
+    def get_violation_bound(self, count):
+        """Returns the upper bound on the fraction of rows that would change
+        the possibilities given that count random rows in a row didn't.
+
+        :param count: The number of sampled rows which changed nothing.
+        """
+        return 1 - (1 - self.confidence) ** (1.0 / count)
+
+    def pick_rows(self, rng, total, size, picked):
+        """Returns a list of up to size indexes of rows that haven't been picked yet.
+
+        :param rng: The random.Random object to pick with.
+        :param total: The total number of rows.
+        :param size: How many rows to pick.
+        :param picked: A set of the indexes of rows already picked, which
+            the new picks are added to.
+        """
+        if size <= 0:
+            return []
+        if size >= total - len(picked):
+            # Cheaper to take every row left than to pick them at random
+            rows = [row for row in range(0, total) if row not in picked]
+        elif self.mode == SamplingEngine.STRATIFIED:
+            rows = []
+            for stratum in range(0, size):
+                low = stratum * total // size
+                high = max((stratum + 1) * total // size, low + 1)
+                row = rng.randrange(low, high)
+                if row not in picked:
+                    rows.append(row)
+        else:
+            # Sample from a window larger than needed so already-picked rows can be skipped
+            rows = []
+            for row in rng.sample(range(total), min(total, size + len(picked))):
+                if row not in picked:
+                    rows.append(row)
+                    if len(rows) == size:
+                        break
+        picked.update(rows)
+        return rows
+
+    def cull(self, options, dates, seed=None):
+        """Culls the token possibility data in a DsOptions object using a
+        sample of a set of date strings. The inner engine, if any, is given
+        the seed, since the rows of a round after the first don't start
+        with it.
+
+        :param options: The DsOptions object to cull.
+        :param dates: A set of identically-formatted date strings. Sets that
+            can't be indexed are read into a list first.
+        :param seed: (optional) The date string the DsOptions object was
+            initialized with. Defaults to None, meaning the first date
+            string.
+        """
+        if not hasattr(dates, '__getitem__'):
+            dates = list(dates)
+        rng = random.Random(self.seed)
+        total = len(dates)
+        if seed is None and total:
+            seed = dates[0]
+        budget = min(total, self.max_size)
+        size = self.initial_size
+        sampled_count = 0
+        # The first row seeded the options so it's always part of the first round
+        picked = set([0])
+        rows = [0] + self.pick_rows(rng, total, min(size, budget) - 1, picked) if total else []
+        # Rows in the order they're culled with, for telling which ones violated possibilities in tolerant mode
+        first_examined = options.dates_examined
+        examined = []
+        while rows:
+            before = self.get_state(options)
+            rows = sorted(rows)
+            examined.extend(rows)
+            batch = [dates[row] for row in rows]
+            if self.engine:
+                self.engine.cull(options, batch, seed=seed)
+            else:
+                options.cull_with_dates(batch)
+            sampled_count += len(rows)
+            self.rounds += 1
+            self.stable = before == self.get_state(options)
+            self.violation_bound = self.get_violation_bound(len(rows)) if self.stable else None
+            if self.stable and self.violation_bound <= self.max_violation_rate:
+                break
+            size *= 2
+            rows = self.pick_rows(rng, total, min(size, budget - sampled_count), picked)
+        if sampled_count == total:
+            # Every row has been seen so the result is exact
+            self.stable = True
+            self.violation_bound = 0.0
+        if options.tolerance is not None:
+            SamplingEngine.map_violating_rows(options, first_examined, examined)
+        self.sampled_count += sampled_count
+        self.total_count += total
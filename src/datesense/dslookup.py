@@ -0,0 +1,103 @@
+"""Contains DsLookup class for DateSense package."""
+from collections import OrderedDict
+
+
+class DsLookup(object):
+    """A DsLookup object answers which of a set of NumOption and WordOption
+    objects allow a value with a single table lookup, instead of asking
+    each option's includes_value method in turn.
+    The tables are built the first time they're needed and DsLookup
+    objects are shared by everything using the same options, so use
+    DsLookup.get_lookup rather than constructing them directly. (Since the
+    tables are only built once, options shouldn't be modified after they've
+    been used.) Only the DsLookup objects for the DsLookup.MAX_LOOKUPS most
+    recently used sets of options are kept.
+    """
+
+    # Numbers from 0 up to this one are looked up in a table, larger ones are checked against each option
+    MAX_TABLE_NUMBER = 9999
+
+    # Most shared DsLookup objects to keep, the least recently used is dropped past this
+    MAX_LOOKUPS = 16
+
+    # Shared DsLookup objects, keyed by the options they were constructed with, least recently used first
+    lookups = OrderedDict()
+
+    def __init__(self, num_options, word_options):
+        """Constructs a DsLookup object.
+        Returns the DsLookup object.
+
+        :param num_options: A set of NumOption objects.
+        :param word_options: A set of WordOption objects.
+        """
+        self.num_options = tuple(num_options)
+        self.word_options = tuple(word_options)
+        self.numbers = None
+        self.words = None
+
+    @staticmethod
+    def get_lookup(num_options, word_options):
+        """Returns the shared DsLookup object for a set of options,
+        constructing it if there isn't one yet.
+
+        :param num_options: A set of NumOption objects.
+        :param word_options: A set of WordOption objects.
+        """
+        key = (tuple(num_options), tuple(word_options))
+        lookup = DsLookup.lookups.get(key)
+        if lookup is not None:
+            DsLookup.lookups.move_to_end(key)
+        else:
+            lookup = DsLookup.lookups[key] = DsLookup(num_options, word_options)
+            if len(DsLookup.lookups) > DsLookup.MAX_LOOKUPS:
+                DsLookup.lookups.popitem(last=False)
+        return lookup
+
+    def build_numbers(self):
+        """Builds the table of which numeric options allow each number from
+        0 to DsLookup.MAX_TABLE_NUMBER. The same options allow every number
+        between the ends of their ranges, so the table is filled a segment
+        at a time, checking only the first number of each."""
+        end = DsLookup.MAX_TABLE_NUMBER + 1
+        bounds = set([0, end])
+        for option in self.num_options:
+            low, high = option.num_range
+            bounds.update(min(max(bound, 0), end) for bound in (low, high + 1))
+        bounds = sorted(bounds)
+        numbers = [None] * end
+        for start, stop in zip(bounds, bounds[1:]):
+            allowing = frozenset(option for option in self.num_options if option.includes_value(start))
+            numbers[start:stop] = [allowing] * (stop - start)
+        self.numbers = numbers
+
+    def build_words(self):
+        """Builds the table of which word options allow each word, and each
+        partial word where an option allows partial matches."""
+        words = {}
+        for option in self.word_options:
+            for word in option.words:
+                words.setdefault(word, set()).add(option)
+                if option.match_length:
+                    for length in range(option.match_length, len(word)):
+                        words.setdefault(word[:length], set()).add(option)
+        self.words = dict((word, frozenset(allowing)) for word, allowing in words.items())
+
+    def get_num_options(self, number):
+        """Returns a frozenset of the numeric options allowing a number.
+
+        :param number: The number to look up.
+        """
+        if 0 <= number <= DsLookup.MAX_TABLE_NUMBER:
+            if self.numbers is None:
+                self.build_numbers()
+            return self.numbers[number]
+        return frozenset(option for option in self.num_options if option.includes_value(number))
+
+    def get_word_options(self, word):
+        """Returns a frozenset of the word options allowing a word.
+
+        :param word: The word to look up.
+        """
+        if self.words is None:
+            self.build_words()
+        return self.words.get(word.lower(), frozenset())
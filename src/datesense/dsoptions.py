@@ -8,7 +8,15 @@ class attributes they reference, as well as the documentation for
 the rules classes and NumOption and WordOption classes for some
 examples and thorough descriptions of how things work.
 """
+import time
+from array import array
+from collections import Counter
+from itertools import chain, islice
+
 from .converter import convert_format
+from .dslookup import DsLookup
+from .dsreservoir import DsReservoir
+from .dsshapecache import DsShapeCache
 from .dstoken import DsToken
 from .dsrules import *
 
@@ -24,6 +32,31 @@ class DsOptions(object):
     UNCOMMON = 1
     COMMON = 2
 
+    # Types accepted as a single date string
+    STRING_TYPES = (str, bytes, bytearray, memoryview)
+
+    # Default for the most distinct values to remember at each position
+    DEFAULT_MAX_DISTINCT_VALUES = 1024
+
+    # How many dates cull_with_dates culls with between checks for convergence when exiting early
+    EARLY_EXIT_INTERVAL = 16
+
+    # How many dates cull_with_dates culls with between checks of the clock when there's a deadline
+    DEADLINE_INTERVAL = 64
+
+    # Default for the most formats detect_formats tells apart, and the format id it gives any other rows
+    DEFAULT_MAX_FORMATS = 16
+    UNKNOWN_FORMAT = 0xFFFF
+
+    # The most date string shapes detect_formats remembers the format id and token spans for
+    MAX_FORMAT_SHAPES = 4096
+
+    # Default number of rows to record violations of each token possibility for in tolerant mode
+    DEFAULT_MAX_VIOLATING_ROWS = 100
+
+    # The most distinct sets of violated possibilities to keep number ranges for in tolerant mode
+    MAX_VIOLATION_SIGNATURES = 1024
+
     class NumOption(object):
         """Contains data representing possible numeric directives."""
 
@@ -263,7 +296,8 @@ class DsOptions(object):
             DsOptions.rule_mutexc_months, DsOptions.rule_mutexc_wkdays, DsOptions.rule_mutexc_weeks
         )
 
-    def __init__(self, format_rules, num_options, word_options, tz_offset_directive):
+    def __init__(self, format_rules, num_options, word_options, tz_offset_directive,
+                 shape_cache_size=DsShapeCache.DEFAULT_MAX_SIZE):
         """Constructs a DsOptions object.
         Returns the DsOptions object.
 
@@ -277,6 +311,9 @@ class DsOptions(object):
         :param tz_offset_directive: Timezone offset directives are a special
             case - this string informs the parser of what directive to use for
             them. (You probably want this to be '%z'.)
+        :param shape_cache_size: (optional) How many date string shapes
+            cull_with_dates should remember token spans for. Defaults to
+            DsShapeCache.DEFAULT_MAX_SIZE.
         """
 
         """The allowed attribute tracks what directives are considered to be
@@ -299,8 +336,104 @@ class DsOptions(object):
                 numeric values were encountered for the corresponding token."""
         self.num_ranges = []
 
+        """The culled_ranges attribute remembers what the num_ranges entry for
+                a position was when each numeric possibility there was culled,
+                which is the range of numbers that possibility allowed. It's a
+                list of dicts keyed by token possibility, one for each token in
+                the sequence derived from the tokenized date string input. It's
+                needed to merge DsPartialState objects exactly."""
+        self.culled_ranges = []
+
+        """The distinct_values attribute tracks the distinct token values each
+                position has been culled with, since culling with a value a second
+                time can't change anything. It's a list of sets, one for each token
+                in the sequence derived from the tokenized date string input. No more
+                than max_distinct_values values are remembered for any position; any
+                beyond that are culled with every time they're encountered."""
+        self.distinct_values = []
+        self.max_distinct_values = DsOptions.DEFAULT_MAX_DISTINCT_VALUES
+
+        """The tolerance attribute, when it isn't None, turns on tolerant mode:
+                instead of discarding a token possibility as soon as one date
+                string disagrees with it, cull_with_value counts the date strings
+                that do in the violations attribute, and cull_violations only
+                discards it if they're more than this fraction of the date strings
+                examined. The violating_rows attribute records the row indexes of
+                up to max_violating_rows of them, for reporting on the quality of
+                the data. Both are lists of dicts, one for each token in the
+                sequence derived from the tokenized date string input, keyed by
+                token possibility. The value_masks attribute remembers the mask
+                and the number to track the range of for each distinct value,
+                since they're needed every time."""
+        self.tolerance = None
+        self.max_violating_rows = DsOptions.DEFAULT_MAX_VIOLATING_ROWS
+        self.violations = []
+        self.violating_rows = []
+        self.value_masks = []
+
+        """The violation_ranges attribute keeps the number ranges separately
+                for date strings that violated different possibilities in
+                tolerant mode, so cull_violations can leave out the numbers
+                from date strings that violated a possibility which remains.
+                It's a dict keyed by the frozenset of (position, possibility)
+                tuples a date string violated, of dicts mapping positions to
+                [lowest, highest] lists. No more than MAX_VIOLATION_SIGNATURES
+                sets are kept apart; date strings with any others are counted
+                as if they violated nothing. The numbers and violations of the
+                date string being culled with are gathered in the
+                tolerated_numbers and tolerated_violations attributes until the
+                next one starts, and tolerated_row is its row index."""
+        self.violation_ranges = {}
+        self.tolerated_row = None
+        self.tolerated_numbers = []
+        self.tolerated_violations = set()
+
+        """The dates_examined attribute counts the date strings that have been
+                culled with. The converged attribute is set to True when
+                cull_with_dates stops early because no more dates could change the
+                detected format. (See is_converged.)"""
+        self.dates_examined = 0
+        self.converged = False
+
+        """The partial attribute is set to True when cull_with_dates stops
+                early because its deadline passed, meaning the detected format
+                only accounts for the first dates_examined date strings."""
+        self.partial = False
+
+        """The seed_signature attribute is the token signature (see
+                DsToken.get_signature) that initialize picked by pre-scanning the
+                dates, or None if it didn't pre-scan. When it's set, date strings
+                with other signatures are skipped instead of culled with, and the
+                dates_skipped attribute counts them."""
+        self.seed_signature = None
+        self.dates_skipped = 0
+
+        """The shape_cache attribute is a DsShapeCache object which remembers
+                where the tokens are in date strings of each shape encountered by
+                cull_with_dates. Its hits and misses attributes tell how many date
+                strings could be sliced without being tokenized."""
+        self.shape_cache = DsShapeCache(shape_cache_size)
+
+        """The reservoir attribute is the DsReservoir object holding
+                representative date strings from the stream read by
+                detect_format_stream, or None if no stream has been read."""
+        self.reservoir = None
+
+        """The adjacent_positions attribute is a dict remembering the bitmask
+                returned by get_adjacent_positions for each delimiter while
+                apply_rules is applying rules, since rules can't add or remove
+                possibilities. The rest of the time it's None and nothing is
+                remembered."""
+        self.adjacent_positions = None
+
         self.num_options = num_options
         self.word_options = word_options
+
+        """The lookup attribute is the DsLookup object shared by everything
+                using the same num_options and word_options, for telling which
+                options allow a value with a single table lookup."""
+        self.lookup = DsLookup.get_lookup(num_options, word_options)
+
         self.tz_offset_directive = tz_offset_directive
         self.format_rules = format_rules
 
@@ -310,14 +443,19 @@ class DsOptions(object):
     # Initialize and process everything for a data set in one convenient method.
     # Recommended you use this unless you're sure of what you're doing.
     @staticmethod
-    def detect_format(dates, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None):
+    def detect_format(dates, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None,
+                      engine=None, early_exit=False, tolerance=None, time_budget=None, seed_scan=0,
+                      score_matrix=False):
         """Initialize and process everything for a data set in one convenient
         method. (Recommended you use this unless you're sure of what you're
         doing.)
         Returns a DsOptions object containing date format information.
 
         :param dates: A set of identically-formatted date strings for which
-            the formatting should be detected.
+            the formatting should be detected. The date strings may also be
+            bytes, bytearray or memoryview objects. The set may be any
+            iterable, like a generator or a file object, and is read only
+            once. (See initialize.)
         :param format_rules: (optional) A set of rule objects such as those
             found in dsrules which inform the parser of what assumptions it
             should make regarding how input data will normally be formatted.
@@ -333,6 +471,36 @@ class DsOptions(object):
             directive to use for them. (You probably want this to be '%z'.)
             Defaults to the value returned by
             DsOptions.get_default_tz_offset_directive().
+        :param engine: (optional) An engine object such as those found in
+            dsengines, to cull token possibility data with in place of
+            DsOptions.cull_with_dates. Defaults to None.
+        :param early_exit: (optional) If True, stop reading dates as soon as
+            no more dates could change the detected format. The
+            dates_examined attribute of the returned object tells how many
+            were read. Not supported by engines, ValueError is raised if
+            it's used with one. Defaults to False.
+        :param tolerance: (optional) If not None, the fraction of date
+            strings which may disagree with a directive before it's ruled
+            out, so that a few malformed date strings don't spoil the
+            result. The get_violating_rows method of the returned object
+            tells which rows disagreed. Early exits aren't possible in this
+            mode. RegexEngine and SamplingEngine support it, BitmaskEngine
+            and NumpyEngine raise ValueError. Defaults to None.
+        :param time_budget: (optional) If not None, the number of seconds
+            to spend reading dates. Once it's spent, the rest of the dates
+            are skipped and the format is detected from the ones read so
+            far; the partial attribute of the returned object is set to
+            True and its dates_examined attribute tells how many were read.
+            Not supported by engines, ValueError is raised if it's used
+            with one. Defaults to None.
+        :param seed_scan: (optional) If not 0, the number of date strings
+            at the start to pre-scan for the most common token signature,
+            instead of assuming the first date string is formatted like the
+            rest. Date strings with any other signature are skipped, and the
+            dates_skipped attribute of the returned object counts them.
+            Defaults to 0.
+        :param score_matrix: (optional) If True, work the scores out in a
+            DsScoreMatrix. (See process.) Defaults to False.
         """
 
         # Handle default values for various options
@@ -342,29 +510,217 @@ class DsOptions(object):
         tz_offset_directive = tz_offset_directive if tz_offset_directive else DsOptions.get_default_tz_offset_directive()
 
         # Do the format detection
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
         options = DsOptions(format_rules, num_options, word_options, tz_offset_directive)
-        options.initialize(dates)
-        options.process()
+        options.tolerance = tolerance
+        options.initialize(dates, engine, early_exit, deadline, seed_scan)
+        options.process(score_matrix=score_matrix)
 
         # All done!
         return options
 
-    def initialize(self, dates):
+    @staticmethod
+    def detect_format_stream(dates, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None,
+                             reservoir=None, early_exit=False, tolerance=None, time_budget=None):
+        """Like detect_format, which also reads any iterable only once and
+        in bounded memory, but also keeps a reservoir of representative
+        date strings from the stream in the reservoir attribute of the
+        returned object, for checking the detected format against or for
+        looking at what kinds of date strings were read.
+        Returns a DsOptions object containing date format information.
+
+        :param dates: An iterable of identically-formatted date strings,
+            such as a generator or a file object.
+        :param format_rules: (optional) See detect_format.
+        :param num_options: (optional) See detect_format.
+        :param word_options: (optional) See detect_format.
+        :param tz_offset_directive: (optional) See detect_format.
+        :param reservoir: (optional) The DsReservoir object to keep
+            representative date strings in. Defaults to None, meaning a new
+            DsReservoir with the default size.
+        :param early_exit: (optional) See detect_format. Reading stops once
+            the format is settled, so the reservoir only represents the
+            date strings read up to then. Defaults to False.
+        :param tolerance: (optional) See detect_format.
+        :param time_budget: (optional) See detect_format.
+        """
+
+        if isinstance(dates, DsOptions.STRING_TYPES):
+            dates = [dates]
+        reservoir = reservoir if reservoir is not None else DsReservoir()
+        options = DsOptions.detect_format(reservoir.iter_add(dates), format_rules, num_options, word_options,
+                                          tz_offset_directive, None, early_exit, tolerance, time_budget)
+        options.reservoir = reservoir
+        return options
+
+    @staticmethod
+    def detect_formats(dates, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None,
+                       max_formats=DEFAULT_MAX_FORMATS):
+        """Like detect_format, but for a set of date strings which mixes
+        several formats. The date strings are sorted into buckets by the
+        kinds of their tokens and the text of their decorators, in a
+        single pass, and the format of each bucket is detected separately.
+        Returns a tuple of a list of DsOptions objects, one for each bucket
+        in the order they were first found, and an array('H') giving the
+        index in that list of the format of each date string.
+
+        :param dates: An iterable of date strings. The date strings may
+            also be bytes, bytearray or memoryview objects.
+        :param format_rules: (optional) See detect_format.
+        :param num_options: (optional) See detect_format.
+        :param word_options: (optional) See detect_format.
+        :param tz_offset_directive: (optional) See detect_format.
+        :param max_formats: (optional) The most buckets to make. Date
+            strings that belong in any other bucket are given the format
+            index DsOptions.UNKNOWN_FORMAT. Defaults to
+            DsOptions.DEFAULT_MAX_FORMATS.
+        """
+
+        # Handle default values for various options
+        format_rules = format_rules if format_rules else DsOptions.get_default_rules()
+        num_options = num_options if num_options else DsOptions.get_default_num_options()
+        word_options = word_options if word_options else DsOptions.get_default_word_options()
+        tz_offset_directive = tz_offset_directive if tz_offset_directive else DsOptions.get_default_tz_offset_directive()
+
+        formats = []
+        row_formats = array('H')
+        # Format index for each token signature with a format, and format index and token spans for each shape
+        signatures = {}
+        shapes = {}
+        for date in dates:
+            if isinstance(date, (bytearray, memoryview)):
+                date = bytes(date)
+            shape = DsToken.get_shape(date)
+            known = shapes.get(shape)
+            if known is None:
+                spans = DsToken.tokenize_spans(date)
+                signature = DsToken.get_signature(shape)
+                format_index = signatures.get(signature)
+                if format_index is None:
+                    if len(formats) < max_formats:
+                        format_index = len(formats)
+                        options = DsOptions(format_rules, num_options, word_options, tz_offset_directive)
+                        options.init_with_date_tokens(DsToken.tokenize_date(date))
+                        formats.append(options)
+                        signatures[signature] = format_index
+                    else:
+                        # Not remembered, so messy input can't grow the signatures without bound
+                        format_index = DsOptions.UNKNOWN_FORMAT
+                known = (format_index, spans)
+                if len(shapes) < DsOptions.MAX_FORMAT_SHAPES:
+                    shapes[shape] = known
+            format_index, spans = known
+            row_formats.append(format_index)
+            if format_index != DsOptions.UNKNOWN_FORMAT:
+                options = formats[format_index]
+                options.cull_with_spans(date, spans)
+                options.dates_examined += 1
+
+        for options in formats:
+            options.cull_decorators()
+            options.process()
+        return formats, row_formats
+
+    def initialize(self, dates, engine=None, early_exit=False, deadline=None, seed_scan=0):
         """Initialize token possibility data for a set of date strings.
 
         :param dates: A set of identically-formatted date strings for which
-            the formatting should be detected.
+            the formatting should be detected. Any iterable will do, like a
+            generator or a file object: it's read only once, and only as far
+            ahead of culling as the first date string (or the seed_scan
+            date strings), so memory use doesn't grow with its length.
+        :param engine: (optional) An engine object such as those found in
+            dsengines, whose cull method is used in place of
+            DsOptions.cull_with_dates. Engines need the whole set at once,
+            so iterables that can't be indexed are read into a list for
+            them. Defaults to None.
+        :param early_exit: (optional) Passed on to cull_with_dates. Engines
+            don't support it, so ValueError is raised if it's used with one.
+            Defaults to False.
+        :param deadline: (optional) Passed on to cull_with_dates. Engines
+            don't support it, so ValueError is raised if it's used with one.
+            Defaults to None.
+        :param seed_scan: (optional) If not 0, pick the date string to
+            initialize with by pre-scanning this many date strings for the
+            most common token signature, and skip date strings with other
+            signatures. (See the seed_signature attribute.) Defaults to 0,
+            meaning the first date string is used and none are skipped.
         """
+        if engine and (early_exit or deadline is not None):
+            raise ValueError("Engines don't support early exits or deadlines")
         # If it's just one string, turn it into a collection like the methods expect
-        if isinstance(dates, ("".__class__, u"".__class__)):
+        if isinstance(dates, DsOptions.STRING_TYPES):
             dates = [dates]
+        # Peek at the date strings to seed with and put them back in front of the rest
+        rest = iter(dates)
+        if seed_scan:
+            scanned = list(islice(rest, seed_scan))
+            seed = self.scan_for_seed(scanned, len(scanned)) if scanned else None
+            dates = self.iter_seed_signature(chain(scanned, rest))
+        else:
+            seed = next(rest, None)
+            if not hasattr(dates, '__getitem__'):
+                dates = chain((seed,), rest)
+        if engine and not hasattr(dates, '__getitem__'):
+            dates = list(dates)
+
         # Do the initializing
-        date_tokens = DsToken.tokenize_date(dates[0])
+        if seed is None:
+            self.init_with_date_tokens([])
+            return
+        date_tokens = DsToken.tokenize_date(seed)
         self.init_with_date_tokens(date_tokens)
-        self.cull_with_dates(dates)
+        if engine:
+            engine.cull(self, dates)
+        else:
+            self.cull_with_dates(dates, early_exit, deadline)
+        if self.tolerance is not None:
+            self.cull_violations()
         self.cull_decorators()
 
-    def process(self, dupe_penalty=-2):
+    def scan_for_seed(self, dates, count):
+        """Find the most common token signature among the first date strings
+        in a set, setting the seed_signature attribute.
+        Returns the first date string with that signature. (Ties go to the
+        signature found first.)
+
+        :param dates: A set of date strings.
+        :param count: How many date strings to scan.
+        """
+        counts = Counter()
+        seeds = {}
+        for date in islice(dates, count):
+            signature = DsToken.get_signature(DsToken.get_shape(date))
+            counts[signature] += 1
+            if signature not in seeds:
+                seeds[signature] = date
+        best = max(seeds, key=lambda signature: counts[signature])
+        self.seed_signature = best
+        return seeds[best]
+
+    def iter_seed_signature(self, dates):
+        """Yields the date strings in a set which have the token signature in
+        the seed_signature attribute, counting the rest in the dates_skipped
+        attribute.
+
+        :param dates: A set of date strings.
+        """
+        # Whether each shape has the signature, for as many shapes as the shape cache remembers
+        matches = {}
+        max_size = self.shape_cache.max_size
+        for date in dates:
+            shape = DsToken.get_shape(date)
+            match = matches.get(shape)
+            if match is None:
+                match = DsToken.get_signature(shape) == self.seed_signature
+                if len(matches) < max_size:
+                    matches[shape] = match
+            if match:
+                yield date
+            else:
+                self.dates_skipped += 1
+
+    def process(self, dupe_penalty=-2, score_matrix=False):
         """Process token possibility data for a set of date strings by
         applying rules and checking for duplicate directives.
         Each token possibility will have a score assigned to it which
@@ -376,7 +732,15 @@ class DsOptions(object):
         :param dupe_penalty: (optional) How the score of duplicate token
             possibilities should be affected, as judged by
             DsOptions.penalize_duplicates().
+        :param score_matrix: (optional) If True, work the scores out in a
+            DsScoreMatrix, which gives the same scores and is faster for date
+            strings with many tokens. Requires numpy. Defaults to False.
         """
+        if score_matrix:
+            # Imported here so importing datesense doesn't import numpy
+            from .dsscorematrix import DsScoreMatrix
+            DsScoreMatrix(self).process(self.format_rules, dupe_penalty)
+            return
         self.apply_rules(self.format_rules)
         if dupe_penalty:
             self.penalize_duplicates(dupe_penalty)
@@ -427,35 +791,109 @@ class DsOptions(object):
 
                 if token.is_number():
                     number = int(token.text)
+                    allowing = self.lookup.get_num_options(number)
                     for option in self.num_options:
-                        if option.includes_value(number):
+                        if option in allowing:
                             allowed_here.append(DsToken.create_number(option))
                             num_range = [number, number]
 
                 elif token.is_word():
+                    allowing = self.lookup.get_word_options(token.text)
                     for option in self.word_options:
-                        if option.includes_value(token.text):
+                        if option in allowing:
                             allowed_here.append(DsToken.create_word(option))
 
                 if token.is_timezone():
                     allowed_here.append(DsToken.create_timezone(self.tz_offset_directive))
 
                 # Add the list of possibilities for this token to the overall list
-                self.allowed.append(allowed_here)
-                self.num_ranges.append(num_range)
+                self.add_position(allowed_here, num_range)
 
-    def cull_with_dates(self, dates):
+    def add_position(self, allowed_here, num_range):
+        """Add the possibilities for the next token position to the token
+        possibility data.
+
+        :param allowed_here: A list of DsToken objects, one for each
+            possibility at the position.
+        :param num_range: A list of the lowest and highest numbers found at
+            the position, or None if there are no numeric possibilities.
+        """
+        self.allowed.append(allowed_here)
+        self.num_ranges.append(num_range)
+        self.culled_ranges.append({})
+        self.distinct_values.append(set())
+        self.value_masks.append({})
+        self.violations.append({})
+        self.violating_rows.append({})
+
+    def cull_with_dates(self, dates, early_exit=False, deadline=None):
         """Cull token possibility data using a set of date strings. The
         values for each token in the date strings are checked against the
         possibilities for that position and if a value is found to lie
         outside the possible values for a directive, that directive is
         discarded as a possibility for the location.
+        Date strings are tokenized into spans rather than DsToken objects,
+        and the shape_cache attribute remembers the spans for each shape,
+        so only the first date string of each shape actually gets
+        tokenized. (If the shape cache is disabled, every date string is
+        tokenized with DsToken.iter_spans instead.)
 
         :param dates: A set of identically-formatted date strings.
+        :param early_exit: (optional) If True, check whether the data has
+            converged every DsOptions.EARLY_EXIT_INTERVAL dates and stop
+            culling once it has, setting the converged attribute. (See
+            is_converged.) Ignored in tolerant mode, where culling with more
+            dates can always change the result. Defaults to False.
+        :param deadline: (optional) A time.perf_counter() value. If not
+            None, check the clock every DsOptions.DEADLINE_INTERVAL dates
+            and stop culling once it's past the deadline, setting the
+            partial attribute. Defaults to None.
         """
+        early_exit = early_exit and self.tolerance is None
+        if self.shape_cache.max_size:
+            get_spans = self.shape_cache.get_spans
+        else:
+            get_spans = DsToken.iter_spans
+        countdown = DsOptions.EARLY_EXIT_INTERVAL
+        deadline_countdown = DsOptions.DEADLINE_INTERVAL
         for date in dates:
-            date_tokens = DsToken.tokenize_date(date)
-            self.cull_with_date_tokens(date_tokens)
+            self.cull_with_spans(date, get_spans(date))
+            self.dates_examined += 1
+            if deadline is not None:
+                deadline_countdown -= 1
+                if not deadline_countdown:
+                    if time.perf_counter() >= deadline:
+                        self.partial = True
+                        return
+                    deadline_countdown = DsOptions.DEADLINE_INTERVAL
+            if early_exit:
+                countdown -= 1
+                if not countdown:
+                    if self.is_converged():
+                        self.converged = True
+                        return
+                    countdown = DsOptions.EARLY_EXIT_INTERVAL
+
+    def cull_with_spans(self, date, spans):
+        """Cull token possibility data using a single date string and the
+        token spans for it. Behaves the same as cull_with_date_tokens but
+        consumes the spans directly, so no DsToken objects are needed for
+        the date string and no text is sliced out of it for positions where
+        there's nothing left to cull.
+
+        :param date: A date string, or a bytes, bytearray or memoryview
+            object.
+        :param spans: An iterable of (kind, start, end) tuples like those
+            yielded by DsToken.iter_spans(), where the method's argument
+            is the date string.
+        """
+        allowed = self.allowed
+        # Token values have to be hashable, which slices of bytearray and memoryview objects aren't
+        if not isinstance(date, (str, bytes)):
+            date = bytes(date)
+        for i, (kind, start, end) in zip(range(len(allowed)), spans):
+            if allowed[i]:
+                self.cull_with_value(i, kind, date[start:end])
 
     def cull_with_date_tokens(self, date_tokens):
         """Cull token possibility data using a single tokenized date. The
@@ -470,34 +908,287 @@ class DsOptions(object):
         """
         iterator_range = min(len(self.allowed), len(date_tokens))
         for i in range(0, iterator_range):
-            # iterate backwards so we can remove elements without hiccuping
-            for j in range(len(self.allowed[i]) - 1, -1, -1):
-                token = self.allowed[i][j]
+            self.cull_with_value(i, date_tokens[i].kind, date_tokens[i].text)
 
-                # if it's not a directive, just check for equivalency
-                if token.is_decorator():
-                    if token.text != date_tokens[i].text:
-                        del self.allowed[i][j]
+    def cull_with_value(self, index, kind, text):
+        """Cull token possibility data for one position using the kind and
+        text of the token found there in a date string.
 
-                # if it is a directive, verify it's the same kind (number/word/timezone)
-                elif token.kind != date_tokens[i].kind:
-                    del self.allowed[i][j]
+        :param index: The position in the allowed attribute to cull.
+        :param kind: The DsToken kind of the token.
+        :param text: The text of the token. May also be a bytes object,
+            which is only decoded if it has to be compared against a
+            decorator or a word.
+        """
+        if self.tolerance is not None:
+            self.tolerate_value(index, kind, text)
+            return
+
+        # Culling with a value that's been culled with before can't change anything
+        distinct_values = self.distinct_values[index]
+        if text in distinct_values:
+            return
+        if len(distinct_values) < self.max_distinct_values:
+            distinct_values.add(text)
+
+        allowed_here = self.allowed[index]
+        mask = self.get_value_mask(index, kind, text)
+        culled = mask != (1 << len(allowed_here)) - 1
+
+        # Remember the range of numbers each numeric possibility allowed before it's culled
+        if culled and self.num_ranges[index]:
+            num_range = self.num_ranges[index]
+            culled_ranges = self.culled_ranges[index]
+            for j, tok in enumerate(allowed_here):
+                if not mask >> j & 1 and tok.kind == DsToken.KIND_NUMBER:
+                    culled_ranges[tok] = num_range[:]
+
+        self.update_num_range(index, kind, text, mask)
+
+        # Remove the possibilities that don't allow the value
+        if culled:
+            allowed_here[:] = [tok for j, tok in enumerate(allowed_here) if mask >> j & 1]
+
+    def update_num_range(self, index, kind, text, mask):
+        """Track the range of numbers encountered by any directive that
+        allows them.
+
+        :param index: The position in the allowed attribute.
+        :param kind: The DsToken kind of the token.
+        :param text: The text of the token.
+        :param mask: The mask returned by get_value_mask for the token.
+        """
+        # A decorator possibility, if there is one, is always the first in the list
+        allowed_here = self.allowed[index]
+        if kind == DsToken.KIND_NUMBER and mask and mask >> (allowed_here[0].kind == DsToken.KIND_DECORATOR):
+            number = int(text)
+            num_range = self.num_ranges[index]
+            if number < num_range[0]:
+                num_range[0] = number
+            if number > num_range[1]:
+                num_range[1] = number
+
+    def tolerate_value(self, index, kind, text):
+        """Count a violation against each token possibility for one
+        position that doesn't allow the kind and text of the token found
+        there in a date string, instead of discarding it. This is what
+        cull_with_value does when the tolerance attribute is set. The
+        date string is identified by its row index, which is the number
+        of date strings examined before it.
+
+        :param index: The position in the allowed attribute.
+        :param kind: The DsToken kind of the token.
+        :param text: The text of the token.
+        """
+        if self.dates_examined != self.tolerated_row:
+            self.flush_tolerated_row()
+            self.tolerated_row = self.dates_examined
+
+        # Remember which possibilities each value violates, since violations have to be counted every time
+        allowed_here = self.allowed[index]
+        value_masks = self.value_masks[index]
+        remembered = value_masks.get(text)
+        if remembered is None:
+            mask = self.get_value_mask(index, kind, text)
+            number = None
+            # A decorator possibility, if there is one, is always the first in the list
+            if kind == DsToken.KIND_NUMBER and mask and mask >> (allowed_here[0].kind == DsToken.KIND_DECORATOR):
+                number = int(text)
+            self.update_num_range(index, kind, text, mask)
+            if len(value_masks) < self.max_distinct_values:
+                value_masks[text] = (mask, number)
+                self.distinct_values[index].add(text)
+        else:
+            mask, number = remembered
+        if number is not None:
+            self.tolerated_numbers.append((index, number))
+
+        if mask != (1 << len(allowed_here)) - 1:
+            violations = self.violations[index]
+            violating_rows = self.violating_rows[index]
+            for j, tok in enumerate(allowed_here):
+                if not mask >> j & 1:
+                    violations[tok] = violations.get(tok, 0) + 1
+                    rows = violating_rows.setdefault(tok, [])
+                    if len(rows) < self.max_violating_rows:
+                        rows.append(self.dates_examined)
+                    self.tolerated_violations.add((index, tok))
+
+    def flush_tolerated_row(self):
+        """Add the numbers gathered by tolerate_value for the date string
+        being culled with to the ranges in the violation_ranges attribute
+        for the possibilities it violated."""
+        if self.tolerated_row is None:
+            return
+        signature = frozenset(self.tolerated_violations)
+        ranges = self.violation_ranges.get(signature)
+        if ranges is None:
+            if len(self.violation_ranges) < DsOptions.MAX_VIOLATION_SIGNATURES:
+                ranges = self.violation_ranges[signature] = {}
+            else:
+                ranges = self.violation_ranges.setdefault(frozenset(), {})
+        for index, number in self.tolerated_numbers:
+            num_range = ranges.get(index)
+            if num_range is None:
+                ranges[index] = [number, number]
+            elif number < num_range[0]:
+                num_range[0] = number
+            elif number > num_range[1]:
+                num_range[1] = number
+        self.tolerated_row = None
+        self.tolerated_numbers = []
+        self.tolerated_violations = set()
+
+    def cull_violations(self):
+        """Discard the token possibilities which were violated by more than
+        the tolerance attribute's fraction of the date strings examined.
+        Call this after culling with dates in tolerant mode, and before
+        cull_decorators. The num_ranges attribute is then worked out again
+        from only the date strings that violated none of the possibilities
+        that remain."""
+        self.flush_tolerated_row()
+        limit = self.tolerance * self.dates_examined
+        for i, allowed_here in enumerate(self.allowed):
+            violations = self.violations[i]
+            allowed_here[:] = [tok for tok in allowed_here if violations.get(tok, 0) <= limit]
+            # The remembered masks refer to possibilities by their index in the list
+            self.value_masks[i] = {}
+
+        num_ranges = {}
+        for signature, ranges in self.violation_ranges.items():
+            if any(tok in self.allowed[i] for i, tok in signature):
+                continue
+            for i, (low, high) in ranges.items():
+                num_range = num_ranges.setdefault(i, [low, high])
+                num_range[0] = min(num_range[0], low)
+                num_range[1] = max(num_range[1], high)
+        # Positions where every number came from a violating date string keep the range of all of them
+        for i, num_range in num_ranges.items():
+            if self.num_ranges[i] is not None:
+                self.num_ranges[i] = num_range
+
+    def get_violating_rows(self):
+        """Returns a sorted list of the row indexes of the date strings that
+        violated any token possibility still remaining, as recorded in tolerant
+        mode. No more than max_violating_rows rows are recorded for each
+        possibility."""
+        rows = set()
+        for i, allowed_here in enumerate(self.allowed):
+            violating_rows = self.violating_rows[i]
+            for tok in allowed_here:
+                rows.update(violating_rows.get(tok, ()))
+        return sorted(rows)
+
+    def get_distinct_counts(self):
+        """Returns a list of how many distinct values each position has been
+        culled with, which tells how much evidence there was for what's
+        possible there. Counts stop growing at max_distinct_values."""
+        return [len(distinct_values) for distinct_values in self.distinct_values]
+
+    def get_value_mask(self, index, kind, text):
+        """Returns a bitmask of the token possibilities at a position which
+        allow the kind and text of a token found there in a date string.
+        Bit j of the mask is set if the possibility at index j of the list
+        for that position allows the value.
+
+        :param index: The position in the allowed attribute to check.
+        :param kind: The DsToken kind of the token.
+        :param text: The text of the token. May also be a bytes or
+            bytearray object, which is only decoded if it has to be compared
+            against a decorator or a word.
+        """
+        allowed_here = self.allowed[index]
+        if not isinstance(text, str):
+            # A decorator possibility, if there is one, is always the first in the list
+            if kind == DsToken.KIND_WORD or (allowed_here and allowed_here[0].kind == DsToken.KIND_DECORATOR):
+                text = text.decode(DsToken.TEXT_ENCODING, DsToken.TEXT_ERRORS)
+        mask = 0
+        allowing = None
+        for j, token in enumerate(allowed_here):
+            # if it's not a directive, just check for equivalency
+            if token.kind == DsToken.KIND_DECORATOR:
+                allows = token.text == text
+
+            # if it is a directive, verify it's the same kind (number/word/timezone)
+            elif token.kind != kind:
+                allows = False
+
+            # if it is a directive and it's the right kind, make sure the data fits
+            # if it's a number, check that this is in the correct range
+            elif kind == DsToken.KIND_NUMBER:
+                if allowing is None:
+                    allowing = self.lookup.get_num_options(int(text))
+                allows = token.option in allowing
+
+            # if it's a word, check that it meets the same requirements
+            elif kind == DsToken.KIND_WORD:
+                if allowing is None:
+                    allowing = self.lookup.get_word_options(text)
+                allows = token.option in allowing
+
+            # timezone offsets fit as long as they're timezone offsets
+            else:
+                allows = True
+
+            if allows:
+                mask |= 1 << j
+        return mask
+
+    def is_converged(self):
+        """Returns true if culling with any more dates can't change which
+        possibility is the best fit at any position, false otherwise.
+        Culling only ever removes possibilities, so that's the case once
+        every position is down to possibilities that any value is either
+        allowed by all of or by none of - normally exactly one possibility,
+        not counting decorators where any directives remain since
+        cull_decorators will remove those, but also directives like '%Y' and
+        '%G' which allow exactly the same values. On top of that, num_ranges
+        must no longer be able to change the outcome of any LikelyRangeRule
+        for those possibilities: either the values encountered already lie
+        outside the likely range, or the directive can't allow any value
+        outside it. Returns false if any position has no possibilities left
+        at all: no format can be detected then, and that isn't a format
+        having been settled on, so culling goes on with the rest of the
+        dates. (More dates can still rule out the remaining possibilities
+        entirely, which leaves no format to detect.)
+        """
+        range_rules = [rule for rule in self.format_rules
+                       if isinstance(rule, LikelyRangeRule) and (rule.pos_score or rule.neg_score)]
+        converged = True
+        for i in range(0, len(self.allowed)):
+            token_list = self.allowed[i]
+            if not token_list:
+                return False
+            # A decorator possibility, if there is one, is always the first in the list
+            directives = token_list[1:] if token_list[0].kind == DsToken.KIND_DECORATOR else token_list
+            if len(directives) > 1 and len(set(map(DsOptions.get_option_values, directives))) > 1:
+                converged = False
+            for tok in directives:
+                if tok.kind != DsToken.KIND_NUMBER:
+                    continue
+                for rule in range_rules:
+                    if tok.text in rule.directives:
+                        num_range = self.num_ranges[i]
+                        if (num_range[0] >= rule.likely_range[0] and num_range[1] <= rule.likely_range[1] and not
+                                (tok.option.num_range[0] >= rule.likely_range[0] and
+                                 tok.option.num_range[1] <= rule.likely_range[1])):
+                            converged = False
+        return converged
 
-                # if it is a directive and it's the right kind, make sure the data fits
-                else:
-                    # if it's a number, check that this is in the correct range
-                    if date_tokens[i].is_number():
-                        number = int(date_tokens[i].text)
-                        if token.option.includes_value(number):
-                            self.num_ranges[i][0] = min(number, self.num_ranges[i][0])
-                            self.num_ranges[i][1] = max(number, self.num_ranges[i][1])
-                        else:
-                            del self.allowed[i][j]
-
-                    # if it's a word, check that it meets the same requirements
-                    elif date_tokens[i].is_word():
-                        if not token.option.includes_value(date_tokens[i].text):
-                            del self.allowed[i][j]
+    @staticmethod
+    def get_option_values(token):
+        """Returns something identifying the values a directive possibility
+        allows, which is equal for any two possibilities allowing exactly the
+        same values.
+
+        :param token: A DsToken object for a directive possibility.
+        """
+        option = token.option
+        if isinstance(option, DsOptions.NumOption):
+            return token.kind, tuple(option.num_range)
+        elif isinstance(option, DsOptions.WordOption):
+            return token.kind, tuple(option.words), option.match_length
+        return token.kind, id(option)
 
     def cull_decorators(self):
         """Remove non-directive token possibilities where any directive
@@ -539,10 +1230,37 @@ class DsOptions(object):
         instance.
 
         :param rules: A set of rule objects, like PatternRule or
-            MutualExclusionRule.
+            MutualExclusionRule. They're applied by way of a RulePlan, which
+            is built the first time the set is used, so the same set of
+            rules should be reused rather than rebuilt for every call.
+        """
+        self.adjacent_positions = {}
+        try:
+            RulePlan.get_plan(rules).apply(self)
+        finally:
+            self.adjacent_positions = None
+
+    def get_adjacent_positions(self, delimiter):
+        """Returns a bitmask of the positions next to any position where a
+        delimiter is a possibility, that is where any possibility's text is
+        in the delimiter string: bit i is set if position i is adjacent.
+        While rules are being applied, the bitmask is remembered in the
+        adjacent_positions attribute, so all the rules using a delimiter
+        share it.
+
+        :param delimiter: The delimiter string, like ':'.
         """
-        for rule in rules:
-            rule.apply(self)
+        remembered = self.adjacent_positions
+        adjacent = remembered.get(delimiter) if remembered is not None else None
+        if adjacent is None:
+            present = 0
+            for i, tok_list in enumerate(self.allowed):
+                if DsToken.get_token_with_text(tok_list, delimiter):
+                    present |= 1 << i
+            adjacent = ((present << 1) | (present >> 1)) & ((1 << len(self.allowed)) - 1)
+            if remembered is not None:
+                remembered[delimiter] = adjacent
+        return adjacent
 
     # This solution isn't perfect but if there are indeed duplicates then the
     # root of the problem probably lies with the rules being used, that they
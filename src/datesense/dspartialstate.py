@@ -0,0 +1,220 @@
+"""Contains DsPartialState class for DateSense package."""
+from itertools import chain
+
+from .dsoptions import DsOptions
+from .dstoken import DsToken
+
+
+class DsPartialState(object):
+    """A DsPartialState object holds what culling a shard of a data set
+    found out about its format, in a compact form which can be serialized
+    with to_dict, sent elsewhere, and merged with the states of the other
+    shards. Merging the states of a data set's shards in order gives the
+    same result as culling with the whole data set in one pass, which only
+    has the token positions of the first date string: a later shard with
+    more positions has the extra ones dropped, the same as its date strings
+    would have. A later shard with fewer positions can't be merged, since
+    nothing is known about the positions it's missing. Merging is
+    associative whenever both ways of grouping the states can be merged.
+    The empty state, DsPartialState(), is the identity for merging. Once
+    everything is merged, finalize applies the rules once to get the
+    format.
+    The candidates attribute is a list, for each token position, of the
+    (kind, text) pairs of the token possibilities remaining there. The
+    ranges attribute is a list, for each token position, of dicts mapping
+    the directive of every numeric possibility the shard started out with
+    to the (lowest, highest) numbers it allowed, which is what's needed to
+    merge num_ranges exactly. Both are None for the empty state.
+    """
+
+    def __init__(self, candidates=None, ranges=None, dates_examined=0):
+        """Constructs a DsPartialState object.
+        Returns the DsPartialState object.
+
+        :param candidates: (optional) See the class documentation. Defaults
+            to None, for the empty state.
+        :param ranges: (optional) See the class documentation. Defaults to
+            None, for the empty state.
+        :param dates_examined: (optional) How many date strings were culled
+            with. Defaults to 0.
+        """
+        self.candidates = candidates
+        self.ranges = ranges
+        self.dates_examined = dates_examined
+
+    def __len__(self):
+        return len(self.candidates) if self.candidates is not None else 0
+
+    def is_empty(self):
+        """Returns True if this is the empty state."""
+        return self.candidates is None
+
+    @staticmethod
+    def from_options(options):
+        """Returns a DsPartialState object for a DsOptions object which has
+        been culled with cull_with_dates, but not yet with cull_decorators.
+        (Engines and tolerant mode don't keep the information needed.)
+
+        :param options: The DsOptions object.
+        """
+        if options.tolerance is not None:
+            raise ValueError("Partial states can't be made in tolerant mode")
+        candidates = []
+        ranges = []
+        for i, allowed_here in enumerate(options.allowed):
+            candidates.append([(tok.kind, tok.text) for tok in allowed_here])
+            ranges_here = {}
+            for tok, num_range in options.culled_ranges[i].items():
+                ranges_here[tok.text] = tuple(num_range)
+            # The possibilities remaining allowed every number that was found here
+            for tok in allowed_here:
+                if tok.kind == DsToken.KIND_NUMBER:
+                    ranges_here[tok.text] = tuple(options.num_ranges[i])
+            ranges.append(ranges_here)
+        return DsPartialState(candidates, ranges, options.dates_examined)
+
+    @staticmethod
+    def from_dates(dates, num_options=None, word_options=None, tz_offset_directive=None):
+        """Culls with a shard of a set of date strings.
+        Returns a DsPartialState object for the shard.
+
+        :param dates: A set of identically-formatted date strings. Any
+            iterable will do, like a generator; it's read only once.
+        :param num_options: (optional) See DsOptions.detect_format.
+        :param word_options: (optional) See DsOptions.detect_format.
+        :param tz_offset_directive: (optional) See DsOptions.detect_format.
+        """
+        if isinstance(dates, DsOptions.STRING_TYPES):
+            dates = [dates]
+        dates = iter(dates)
+        seed = next(dates, None)
+        if seed is None:
+            return DsPartialState()
+        num_options = num_options if num_options else DsOptions.get_default_num_options()
+        word_options = word_options if word_options else DsOptions.get_default_word_options()
+        tz_offset_directive = tz_offset_directive if tz_offset_directive else DsOptions.get_default_tz_offset_directive()
+        options = DsOptions(None, num_options, word_options, tz_offset_directive)
+        options.init_with_date_tokens(DsToken.tokenize_date(seed))
+        options.cull_with_dates(chain((seed,), dates))
+        return DsPartialState.from_options(options)
+
+    def merge(self, other):
+        """Merges this state with the state of the shard that comes after it.
+        Returns a new DsPartialState object, with this state's token
+        positions. Raises ValueError if the other state has fewer.
+
+        :param other: The DsPartialState object to merge with.
+        """
+        if other.is_empty():
+            return self
+        if self.is_empty():
+            return other
+        if len(self) > len(other):
+            raise ValueError("Can't merge states with %d and %d token positions" % (len(self), len(other)))
+        candidates = []
+        ranges = []
+        for left, right, left_ranges, right_ranges in zip(self.candidates, other.candidates, self.ranges,
+                                                          other.ranges):
+            # A possibility remains only if neither shard ruled it out; the order is the first shard's
+            right_set = set(right)
+            candidates.append([candidate for candidate in left if candidate in right_set])
+            # The other shard's numbers only count for possibilities this shard hadn't ruled out
+            ranges_here = dict(left_ranges)
+            for kind, text in left:
+                if kind == DsToken.KIND_NUMBER and text in right_ranges:
+                    low, high = ranges_here[text]
+                    right_low, right_high = right_ranges[text]
+                    ranges_here[text] = (min(low, right_low), max(high, right_high))
+            ranges.append(ranges_here)
+        return DsPartialState(candidates, ranges, self.dates_examined + other.dates_examined)
+
+    def get_num_ranges(self):
+        """Returns a list of the num_ranges a DsOptions object culled with
+        all the same date strings would have."""
+        num_ranges = []
+        for ranges_here in self.ranges or ():
+            if ranges_here:
+                num_ranges.append([min(low for low, high in ranges_here.values()),
+                                   max(high for low, high in ranges_here.values())])
+            else:
+                num_ranges.append(None)
+        return num_ranges
+
+    def to_options(self, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None):
+        """Rebuilds token possibility data from this state, so that culling
+        can carry on from where it left off.
+        Returns a DsOptions object which hasn't been processed.
+
+        :param format_rules: (optional) See DsOptions.detect_format.
+        :param num_options: (optional) See DsOptions.detect_format. Must be
+            the same as the states were made with.
+        :param word_options: (optional) See DsOptions.detect_format. Must be
+            the same as the states were made with.
+        :param tz_offset_directive: (optional) See DsOptions.detect_format.
+        """
+        format_rules = format_rules if format_rules else DsOptions.get_default_rules()
+        num_options = num_options if num_options else DsOptions.get_default_num_options()
+        word_options = word_options if word_options else DsOptions.get_default_word_options()
+        tz_offset_directive = tz_offset_directive if tz_offset_directive else DsOptions.get_default_tz_offset_directive()
+        num_directives = dict((option.directive, option) for option in num_options)
+        word_directives = dict((option.directive, option) for option in word_options)
+
+        options = DsOptions(format_rules, num_options, word_options, tz_offset_directive)
+        for i, num_range in enumerate(self.get_num_ranges()):
+            allowed_here = []
+            for kind, text in self.candidates[i]:
+                if kind == DsToken.KIND_DECORATOR:
+                    allowed_here.append(DsToken.create_decorator(text))
+                elif kind == DsToken.KIND_NUMBER:
+                    allowed_here.append(DsToken.create_number(num_directives[text]))
+                elif kind == DsToken.KIND_WORD:
+                    allowed_here.append(DsToken.create_word(word_directives[text]))
+                else:
+                    allowed_here.append(DsToken.create_timezone(text))
+            options.add_position(allowed_here, num_range)
+            # Possibilities that were culled still need their ranges for making partial states later on
+            remaining = set(tok.text for tok in allowed_here if tok.kind == DsToken.KIND_NUMBER)
+            for text, (low, high) in self.ranges[i].items():
+                if text not in remaining:
+                    options.culled_ranges[i][DsToken.create_number(num_directives[text])] = [low, high]
+        options.dates_examined = self.dates_examined
+        return options
+
+    def finalize(self, format_rules=None, num_options=None, word_options=None, tz_offset_directive=None):
+        """Rebuilds token possibility data from this state and processes it,
+        like DsOptions.detect_format does after culling.
+        Returns a DsOptions object containing date format information.
+
+        :param format_rules: (optional) See to_options.
+        :param num_options: (optional) See to_options.
+        :param word_options: (optional) See to_options.
+        :param tz_offset_directive: (optional) See to_options.
+        """
+        options = self.to_options(format_rules, num_options, word_options, tz_offset_directive)
+        options.cull_decorators()
+        options.process()
+        return options
+
+    def to_dict(self):
+        """Returns a dict of this state's data made up of only lists, strings
+        and numbers, suitable for serializing with json."""
+        return {
+            'candidates': [[[kind, text] for kind, text in candidates_here] for candidates_here in self.candidates]
+            if self.candidates is not None else None,
+            'ranges': [[[text, low, high] for text, (low, high) in ranges_here.items()] for ranges_here in self.ranges]
+            if self.ranges is not None else None,
+            'dates_examined': self.dates_examined,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Returns a DsPartialState object from a dict returned by to_dict.
+
+        :param data: The dict.
+        """
+        candidates = data['candidates']
+        ranges = data['ranges']
+        if candidates is not None:
+            candidates = [[(kind, text) for kind, text in candidates_here] for candidates_here in candidates]
+            ranges = [dict((text, (low, high)) for text, low, high in ranges_here) for ranges_here in ranges]
+        return DsPartialState(candidates, ranges, data['dates_examined'])
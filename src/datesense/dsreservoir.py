@@ -0,0 +1,97 @@
+"""Contains DsReservoir class for DateSense package."""
+import random
+from collections import OrderedDict
+
+from .dstoken import DsToken
+
+
+class DsReservoir(object):
+    """A DsReservoir object keeps a fixed-size set of representative date
+    strings from a stream of them, however long the stream is, so that a
+    stream can be culled on the fly without holding on to all of it.
+    The first date string of each distinct shape (see DsToken.get_shape)
+    is kept, up to max_shapes of them, and the remaining space is filled
+    with a uniform random sample of the whole stream. The count attribute
+    tells how many date strings have been added.
+    """
+
+    # Default number of date strings to keep
+    DEFAULT_MAX_SIZE = 256
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, max_shapes=None, seed=0):
+        """Constructs a DsReservoir object.
+        Returns the DsReservoir object.
+
+        :param max_size: (optional) The maximum number of date strings to
+            keep altogether. Defaults to DsReservoir.DEFAULT_MAX_SIZE.
+        :param max_shapes: (optional) The maximum number of them to keep as
+            one per shape. Defaults to None, meaning half of max_size.
+        :param seed: (optional) Seed for picking the random sample.
+            Defaults to 0.
+        """
+        self.max_size = max_size
+        self.max_shapes = max_size // 2 if max_shapes is None else min(max_shapes, max_size)
+
+        """The count attribute counts the date strings that have been added."""
+        self.count = 0
+
+        """The shapes attribute maps each shape kept to the first date string
+                seen with that shape."""
+        self.shapes = OrderedDict()
+
+        """The samples attribute is the uniform random sample of the stream,
+                picked using the random attribute's random.Random object."""
+        self.samples = []
+        self.random = random.Random(seed)
+
+    def __len__(self):
+        return len(self.shapes) + len(self.samples)
+
+    def add(self, date_string):
+        """Adds a date string to the reservoir, keeping it if it's the first
+        of a new shape or if it's picked for the random sample.
+
+        :param date_string: The date string to add. Bytearray and memoryview
+            objects are copied to bytes when kept.
+        """
+        if len(self.shapes) < self.max_shapes:
+            shape = DsToken.get_shape(date_string)
+            if shape not in self.shapes:
+                self.shapes[shape] = DsReservoir.get_kept(date_string)
+        sample_size = self.max_size - self.max_shapes
+        if len(self.samples) < sample_size:
+            self.samples.append(DsReservoir.get_kept(date_string))
+        else:
+            # Each date string so far has had the same chance of being in the sample
+            index = self.random.randint(0, self.count)
+            if index < sample_size:
+                self.samples[index] = DsReservoir.get_kept(date_string)
+        self.count += 1
+
+    def iter_add(self, dates):
+        """Adds each of a set of date strings to the reservoir as they're
+        iterated over, yielding them on.
+
+        :param dates: An iterable of date strings.
+        """
+        for date_string in dates:
+            self.add(date_string)
+            yield date_string
+
+    def get_dates(self):
+        """Returns a list of the date strings kept, one for each shape first
+        and then the random sample.
+        """
+        return list(self.shapes.values()) + self.samples
+
+    @staticmethod
+    def get_kept(date_string):
+        """Returns a date string as it should be kept, which is a copy for
+        objects whose contents can change.
+
+        :param date_string: The date string being kept.
+        """
+        # The caller is free to reuse mutable buffers once they've been added
+        if isinstance(date_string, (bytearray, memoryview)):
+            return bytes(date_string)
+        return date_string
@@ -2,3 +2,4 @@ from .likely_range_rule import LikelyRangeRule
 from .delimeter_rule import DelimiterRule
 from .mutual_exclusive_rule import MutualExclusionRule
 from .pattern_rule import PatternRule
+from .rule_plan import RulePlan
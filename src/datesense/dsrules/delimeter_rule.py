@@ -1,6 +1,3 @@
-from ..dstoken import DsToken
-
-
 class DelimiterRule(object):
     """Delimiter rules mean that if some tokens are separated by a
     delimiter, assumptions can be made for what those tokens represent.
@@ -38,29 +35,41 @@ class DelimiterRule(object):
     # Negative reinforcement: Specified possibilities that are not adjacent to one of the specified delimiters
     def apply(self, options):
         """Applies the rule to the provided DsOptions object by affecting token possibility scores."""
-        adjacent = []
-        # For each delimiter specified:
-        for delimiter in self.delimiters:
-            tok_list_count = len(options.allowed)
-            # Determine which date tokens are adjacent to any one that has the delimiter text as a possibility
-            for i in range(0, tok_list_count):
-                tok_list = options.allowed[i]
-                delim_tok = DsToken.get_token_with_text(tok_list, delimiter)
-                if delim_tok:
-                    if i > 0 and (options.allowed[i - 1] not in adjacent):
-                        adjacent.append(options.allowed[i - 1])
-                    if i < tok_list_count - 1 and (options.allowed[i + 1] not in adjacent):
-                        adjacent.append(options.allowed[i + 1])
-        # Affect scores of possibilities specified
-        for tok_list in options.allowed:
-            # Positive reinforcement
-            if tok_list in adjacent:
-                if self.pos_score:
-                    for tok in tok_list:
-                        if tok.text in self.directives:
-                            tok.score += self.pos_score
-            # Negative reinforcement
-            elif self.neg_score:
+        adjacent = self.get_adjacent_positions(options)
+        for i, tok_list in enumerate(options.allowed):
+            score = self.pos_score if adjacent >> i & 1 else self.neg_score
+            if score:
                 for tok in tok_list:
                     if tok.text in self.directives:
-                        tok.score += self.neg_score
+                        tok.score += score
+
+    def get_adjacent_positions(self, options):
+        """Returns a bitmask of the positions in a DsOptions object that are
+        next to any position where any of the rule's delimiters is a
+        possibility. (See DsOptions.get_adjacent_positions.)
+
+        :param options: The DsOptions object.
+        """
+        adjacent = 0
+        for delimiter in self.delimiters:
+            adjacent |= options.get_adjacent_positions(delimiter)
+        return adjacent
+
+    def get_match_groups(self):
+        """Returns what the rule matches token possibilities against, for RulePlan."""
+        return [self.directives]
+
+    def apply_slots(self, options, slots):
+        """Applies the rule to the provided DsOptions object like apply does,
+        given the possibilities matching the rule as found by RulePlan.
+
+        :param options: The DsOptions object.
+        :param slots: A list holding a list of (position, token) tuples for
+            the possibilities matching the rule's directives.
+        """
+        adjacent = self.get_adjacent_positions(options)
+        for i, tok in slots[0]:
+            if adjacent >> i & 1:
+                tok.score += self.pos_score
+            else:
+                tok.score += self.neg_score
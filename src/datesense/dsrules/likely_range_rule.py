@@ -57,3 +57,23 @@ class LikelyRangeRule(object):
                     else:
                         # Negative reinforcement
                         tok.score += self.neg_score
+
+    def get_match_groups(self):
+        """Returns what the rule matches token possibilities against, for RulePlan."""
+        return [self.directives]
+
+    def apply_slots(self, options, slots):
+        """Applies the rule to the provided DsOptions object like apply does,
+        given the possibilities matching the rule as found by RulePlan.
+
+        :param options: The DsOptions object.
+        :param slots: A list holding a list of (position, token) tuples for
+            the possibilities matching the rule's directives.
+        """
+        for i, tok in slots[0]:
+            if tok.kind == DsToken.KIND_NUMBER:
+                if (options.num_ranges[i][0] >= self.likely_range[0] and
+                        options.num_ranges[i][1] <= self.likely_range[1]):
+                    tok.score += self.pos_score
+                else:
+                    tok.score += self.neg_score
@@ -36,34 +36,44 @@ class MutualExclusionRule(object):
     #   found and the scores of all the other possibilities will be affected
     def apply(self, options):
         """Applies the rule to the provided DsOptions object by affecting token possibility scores."""
-        # Find the highest-scoring instance of each token possibility specified
-        matched_tokens = []
-        for tok_list in options.allowed:
+        # Gather the possibilities matching each of the specified directives in one pass
+        slots = [[] for match_text in self.directives]
+        for i, tok_list in enumerate(options.allowed):
             for tok in tok_list:
-                for i in range(0, len(self.directives)):
-                    matched_tokens.append(None)
-                    match_text = self.directives[i]
+                for directive_slots, match_text in zip(slots, self.directives):
                     if tok.text in match_text:
-                        if (not matched_tokens[i]) or tok.score > matched_tokens[i].score:
-                            matched_tokens[i] = tok
-        # Determine which of the possibilities had the highest score
+                        directive_slots.append((i, tok))
+        self.apply_slots(options, slots)
+
+    def get_match_groups(self):
+        """Returns what the rule matches token possibilities against, for RulePlan."""
+        return list(self.directives)
+
+    def apply_slots(self, options, slots):
+        """Applies the rule to the provided DsOptions object like apply does,
+        given the possibilities matching the rule as found by RulePlan.
+
+        :param options: The DsOptions object.
+        :param slots: A list holding a list of (position, token) tuples for
+            the possibilities matching each of the rule's directives, in the
+            order they're found.
+        """
+        # Find the highest-scoring instance of each directive (Ties go to the first found.)
+        best = [None] * len(slots)
+        for i, directive_slots in enumerate(slots):
+            for position, tok in directive_slots:
+                if best[i] is None or tok.score > best[i].score:
+                    best[i] = tok
+        # Determine which of the directives had the highest score (Ties go to the lowest-index directive.)
         highest_tok = None
         highest_index = 0
-        for i in range(0, len(matched_tokens)):
-            tok = matched_tokens[i]
-            if tok and ((not highest_tok) or tok.score > highest_tok.score):
+        for i, tok in enumerate(best):
+            if tok is not None and (highest_tok is None or tok.score > highest_tok.score):
                 highest_tok = tok
                 highest_index = i
-        # Affect scores (Ties go to the lowest-index argument.)
-        if highest_tok:
-            for tok_list in options.allowed:
-                for tok in tok_list:
-                    for i in range(0, len(self.directives)):
-                        match_text = self.directives[i]
-                        if tok.text in match_text:
-                            if i == highest_index:
-                                # Positive reinforcement
-                                tok.score += self.pos_score
-                            else:
-                                # Negative reinforcement
-                                tok.score += self.neg_score
+        # Affect scores
+        if highest_tok is not None:
+            for i, directive_slots in enumerate(slots):
+                score = self.pos_score if i == highest_index else self.neg_score
+                for position, tok in directive_slots:
+                    tok.score += score
@@ -1,3 +1,8 @@
+from bisect import bisect_left
+
+from .rule_plan import RulePlan
+
+
 class PatternRule(object):
     """Pattern rules inform the parser that tokens commonly show
     up in the sequence provided. ('%m','/','%d','/',('%y','%Y'))
@@ -47,55 +52,102 @@ class PatternRule(object):
     #   found to be part of an instance of the pattern
     def apply(self, options):
         """Applies the rule to the provided DsOptions object by affecting token possibility scores."""
-        # Which date token in the pattern are we on?
-        arg_index = 0
-        # How many tokens have we looked over since the last one that's part of the pattern?
-        counter = 0
-        # What are the token possibilities we've run into so far that fit the pattern?
-        ordered_tokens = []
-        ordered_tokens_current = []
-        # Iterate through the lists of token possibilities
-        for token_list in options.allowed:
-            # Check if we've passed over the allowed number of in-between tokens yet,
-            # if so then reset the pattern search
-            if ordered_tokens_current:
-                counter += 1
-                if counter > self.max_distance:
-                    arg_index = 0
-                    counter = 0
-                    ordered_tokens_current = []
-            # Does the token here match the pattern?
-            # (Only consider directives with scores greater than or equal to self.min_match_score,
-            # and decorators of any score)
-            found_token = 0
-            for tok in token_list:
-                if (tok.score >= self.min_match_score or tok.is_decorator()) and tok.text in self.sequence[arg_index]:
-                    ordered_tokens_current.append(tok)
-                    found_token += 1
-            # One or more possibilities here match the pattern!
-            # On to the next expected possibility in the pattern sequence.
-            if found_token:
-                arg_index += 1
-                counter = 0
-                # Did we hit the end of the pattern sequence?
-                # If so, let's reset so we can see if there's any more occurrences.
-                if arg_index == len(self.sequence):
-                    arg_index = 0
-                    ordered_tokens.extend(ordered_tokens_current)
+        index = RulePlan.get_index(options)
+        slots = []
+        for texts in map(RulePlan.get_match_texts, self.sequence):
+            item_slots = sorted(slot for text in texts if text in index for slot in index[text])
+            slots.append([(i, tok) for i, j, tok in item_slots])
+        self.apply_slots(options, slots)
+
+    def get_match_groups(self):
+        """Returns what the rule matches token possibilities against, for RulePlan."""
+        return list(self.sequence)
+
+    def apply_slots(self, options, slots):
+        """Applies the rule to the provided DsOptions object like apply does,
+        given the possibilities matching the rule as found by RulePlan.
+        The sequence is searched for by an automaton which only visits the
+        positions where the item of the sequence it's looking for can be
+        matched, jumping straight to them. Its state is which item it's on,
+        where it last matched one, and the possibilities matched since the
+        search last gave up. It gives up, going back to the first item, if
+        more than max_distance positions pass without a match. Finding the
+        whole sequence sends it back to the first item without giving up,
+        so the possibilities matched before then count again each time the
+        sequence is found before it does.
+
+        :param options: The DsOptions object.
+        :param slots: A list holding a list of (position, token) tuples for
+            the possibilities matching each item in the rule's sequence, in
+            the order they're found.
+        """
+        # The sequence can't be found if anything in it is missing, leaving only negative reinforcement
+        if not self.neg_score and not all(slots):
+            return
+
+        # Where each item in the sequence can be matched, and by which possibilities
+        # (Only consider directives with scores greater than or equal to self.min_match_score,
+        # and decorators of any score)
+        item_positions = []
+        item_matches = []
+        for item_slots in slots:
+            positions = []
+            matches = {}
+            for i, tok in item_slots:
+                if tok.score >= self.min_match_score or tok.is_decorator():
+                    if i in matches:
+                        matches[i].append(tok)
+                    else:
+                        matches[i] = [tok]
+                        positions.append(i)
+            item_positions.append(positions)
+            item_matches.append(matches)
+
+        # How many times each possibility was part of a found instance of the sequence
+        found_counts = {}
+        # Possibilities matched since the search last gave up, with how many instances were found before each
+        current = []
+        found = 0
+        item = 0
+        position = 0
+        last = None
+        count = len(options.allowed)
+        while position < count:
+            positions = item_positions[item]
+            next_index = bisect_left(positions, position)
+            next_position = positions[next_index] if next_index < len(positions) else None
+            if current and (next_position is None or next_position - last > self.max_distance):
+                # Give up where too many positions have passed without a match
+                for tok, found_before in current:
+                    if found > found_before:
+                        found_counts[tok] = found_counts.get(tok, 0) + found - found_before
+                current = []
+                item = 0
+                position = last + self.max_distance + 1
+                continue
+            if next_position is None:
+                break
+            for tok in item_matches[item][next_position]:
+                current.append((tok, found))
+            item += 1
+            last = next_position
+            position = next_position + 1
+            if item == len(self.sequence):
+                item = 0
+                found += 1
+        for tok, found_before in current:
+            if found > found_before:
+                found_counts[tok] = found_counts.get(tok, 0) + found - found_before
+
         # Positive reinforcement
         if self.pos_score:
-            for tok in ordered_tokens:
-                tok.score += self.pos_score
+            for tok, times in found_counts.items():
+                tok.score += self.pos_score * times
         # Negative reinforcement
         if self.neg_score:
-            # Iterate through all possibilities for all tokens
-            for token_list in options.allowed:
-                for tok in token_list:
-                    # Is the possibility a directive?
-                    if not tok.is_decorator():
-                        # Does the possibility exist anywhere in the pattern?
-                        for match_text in self.sequence:
-                            if tok.text in match_text:
-                                # Was it not a part of any found instances of the pattern? If so, whack the score.
-                                if tok not in ordered_tokens:
-                                    tok.score += self.neg_score
+            # Directives anywhere in the pattern that weren't part of any found instances of it get whacked,
+            # once for each item in the sequence they match
+            for item_slots in slots:
+                for i, tok in item_slots:
+                    if not tok.is_decorator() and tok not in found_counts:
+                        tok.score += self.neg_score
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+
+
+class RulePlan(object):
+    """A RulePlan object applies a set of rules to token possibility data
+    the same way applying each of them in turn would, but without every
+    rule scanning every possibility at every position.
+    Rules match possibilities by their text, so the plan works out up
+    front which texts each rule could match, and when it's applied it
+    indexes the possibilities by text once and hands each rule only the
+    ones it matches. Rules that match nothing are skipped altogether.
+    A rule takes part in the plan by having a get_match_groups method,
+    returning the things it matches possibilities against (like
+    directives or delimiters) as a list of strings or tuples of strings
+    to be tested with the 'in' operator, and an apply_slots method, which
+    takes the possibilities each of those matched. Other rules are applied
+    with their apply method, in order with the rest.
+    Plans are built once for each set of rules and shared, so rules
+    shouldn't be changed after being used. Only the plans for the
+    RulePlan.MAX_PLANS most recently used sets are kept.
+    """
+
+    # Most plans to keep, the least recently used is dropped past this
+    MAX_PLANS = 64
+
+    # Plan for each set of rules that's been used recently, least recently used first
+    plans = OrderedDict()
+
+    def __init__(self, rules):
+        """Constructs a RulePlan object.
+        You probably want to be using RulePlan.get_plan instead, so
+        plans are shared.
+        Returns the RulePlan object.
+
+        :param rules: A set of rule objects, like PatternRule or
+            MutualExclusionRule.
+        """
+        self.rules = tuple(rules)
+        """The groups attribute has, for each rule, None if the rule doesn't
+        take part in the plan or else a list with the set of texts that
+        could match each of its match groups."""
+        self.groups = []
+        for rule in self.rules:
+            if hasattr(rule, 'get_match_groups') and hasattr(rule, 'apply_slots'):
+                self.groups.append([RulePlan.get_match_texts(match) for match in rule.get_match_groups()])
+            else:
+                self.groups.append(None)
+
+    @staticmethod
+    def get_plan(rules):
+        """Returns the RulePlan object for a set of rules, building it the
+        first time the set is used.
+
+        :param rules: A set of rule objects.
+        """
+        key = tuple(rules)
+        plan = RulePlan.plans.get(key)
+        if plan is not None:
+            RulePlan.plans.move_to_end(key)
+        else:
+            plan = RulePlan(key)
+            RulePlan.plans[key] = plan
+            if len(RulePlan.plans) > RulePlan.MAX_PLANS:
+                RulePlan.plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def get_match_texts(match):
+        """Returns a frozenset of every text for which 'text in match' holds,
+        that is every substring of a string or every item of a tuple.
+
+        :param match: A string or a tuple of strings.
+        """
+        if isinstance(match, str):
+            return frozenset(match[start:end] for start in range(0, len(match) + 1)
+                             for end in range(start, len(match) + 1))
+        return frozenset(match)
+
+    @staticmethod
+    def get_index(options):
+        """Returns a dict mapping the text of each token possibility in a
+        DsOptions object to a list of (position, index, token) tuples for
+        the possibilities with that text, in the order they're found.
+
+        :param options: The DsOptions object.
+        """
+        index = {}
+        for i, tok_list in enumerate(options.allowed):
+            for j, tok in enumerate(tok_list):
+                slots = index.get(tok.text)
+                if slots is None:
+                    index[tok.text] = [(i, j, tok)]
+                else:
+                    slots.append((i, j, tok))
+        return index
+
+    def apply(self, options):
+        """Applies the rules to the provided DsOptions object by affecting token possibility scores.
+
+        :param options: The DsOptions object.
+        """
+        # Rules only change scores, so the possibilities can be indexed just once
+        index = RulePlan.get_index(options)
+        for rule, groups in zip(self.rules, self.groups):
+            if groups is None:
+                rule.apply(options)
+                continue
+            slots = []
+            for texts in groups:
+                found = [index[text] for text in texts if text in index]
+                if len(found) == 1:
+                    group_slots = found[0]
+                else:
+                    # Keep the order the possibilities would be scanned in
+                    group_slots = sorted(slot for text_slots in found for slot in text_slots)
+                slots.append([(i, tok) for i, j, tok in group_slots])
+            if any(slots):
+                rule.apply_slots(options, slots)
@@ -0,0 +1,324 @@
+"""Contains DsScoreMatrix class for DateSense package."""
+from .dsrules import DelimiterRule, LikelyRangeRule, MutualExclusionRule
+from .dstoken import DsToken
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, it's only needed by DsScoreMatrix
+    numpy = None
+
+
+class DsScoreMatrix(object):
+    """A DsScoreMatrix object scores the token possibilities of a DsOptions
+    object the same way DsOptions.process does, but keeps the scores in a
+    numpy array instead of the score attributes of the DsToken objects.
+    The array has a row for each position and a column for each of the
+    possibilities there, in the same order as in the allowed lists, with a
+    mask telling which cells hold a possibility, since positions don't all
+    have the same number of possibilities. The text and kind of the
+    possibility in each cell are kept in arrays of the same shape, so
+    delimiter, likely range and mutual exclusion rules and the duplicate
+    penalties of DsOptions.penalize_duplicates become array operations over
+    every position at once, and the highest-scoring possibility at each
+    position is found with an argmax for each row. Pattern rules and rules
+    of other types are applied after the scores are written back to the
+    DsToken objects, and the scores are read from them again afterwards.
+    Rules taking part in RulePlan objects are handed the possibilities
+    they match as found using the arrays, other rules are applied with
+    their apply method.
+    Scores are added up exactly the same as by the DsToken objects, so the
+    scores written back, and so the detected format, are identical.
+    This class requires numpy to be installed.
+    """
+
+    def __init__(self, options):
+        """Constructs a DsScoreMatrix object for the token possibility data
+        of a DsOptions object, taking the current scores of its
+        possibilities. Possibilities shouldn't be added or removed while
+        the object is in use.
+        Returns the DsScoreMatrix object.
+
+        :param options: The DsOptions object.
+        """
+        if numpy is None:
+            raise ImportError('DsScoreMatrix requires numpy to be installed.')
+        self.options = options
+        """The tokens attribute has every possibility in the order the cells
+        holding them are in the arrays."""
+        self.tokens = [tok for tok_list in options.allowed for tok in tok_list]
+        """The texts attribute has the distinct texts of the possibilities,
+        indexed by the codes in the codes array."""
+        self.texts = []
+        shape = (len(options.allowed), max([len(tok_list) for tok_list in options.allowed], default=0))
+        self.mask = numpy.zeros(shape, dtype=bool)
+        self.codes = numpy.zeros(shape, dtype=numpy.intp)
+        self.kinds = numpy.zeros(shape, dtype=numpy.int8)
+        if self.tokens:
+            self.mask = numpy.arange(shape[1]) < numpy.array([len(tok_list) for tok_list in options.allowed])[:, None]
+            text_codes = {}
+            for tok in self.tokens:
+                if tok.text not in text_codes:
+                    text_codes[tok.text] = len(self.texts)
+                    self.texts.append(tok.text)
+            self.codes[self.mask] = [text_codes[tok.text] for tok in self.tokens]
+            self.kinds[self.mask] = [tok.kind for tok in self.tokens]
+        # Index in the tokens attribute of the possibility in each cell
+        self.token_indexes = numpy.cumsum(self.mask.ravel()).reshape(shape) - 1
+        self.scores = None
+        self.read_scores()
+        """The tokens_current attribute is True while the scores of the
+        DsToken objects are the same as the ones in the array, and the
+        array_current attribute is True while the scores in the array are
+        the same as the ones of the DsToken objects."""
+        self.tokens_current = True
+        self.array_current = True
+        # Cells matching each string or tuple the rules match possibilities against
+        self.matches = {}
+        # (position, token) tuples for the cells matching each of those
+        self.match_slots = {}
+
+    def read_scores(self):
+        """Sets the scores in the array to the scores of the DsToken objects."""
+        flat = numpy.array([tok.score for tok in self.tokens])
+        self.scores = numpy.zeros(self.mask.shape, dtype=flat.dtype if flat.size else numpy.int64)
+        self.scores[self.mask] = flat
+
+    def write_scores(self):
+        """Sets the scores of the DsToken objects to the scores in the array."""
+        for tok, score in zip(self.tokens, self.scores[self.mask].tolist()):
+            tok.score = score
+
+    def update_scores(self):
+        """Reads the scores of the DsToken objects into the array if they
+        may have been changed since the array was last updated."""
+        if not self.array_current:
+            self.read_scores()
+            self.array_current = True
+            self.tokens_current = True
+
+    def update_tokens(self):
+        """Writes the scores in the array to the DsToken objects if they
+        may have been changed since the DsToken objects were last updated."""
+        if not self.tokens_current:
+            self.write_scores()
+            self.tokens_current = True
+
+    def add_scores(self, increments):
+        """Adds an array of increments to the scores in the array.
+
+        :param increments: An array of the same shape, or one which
+            broadcasts to it.
+        """
+        self.update_scores()
+        # Not done in place, so integer scores become floats if any increments are
+        self.scores = self.scores + increments
+        self.tokens_current = False
+
+    def get_match(self, match):
+        """Returns a boolean array telling which cells hold a possibility
+        whose text is in a string or tuple of strings, the same as the
+        'in' operator would for each possibility.
+
+        :param match: A string or a tuple of strings, like a rule's directives.
+        """
+        key = match if isinstance(match, (str, tuple)) else tuple(match)
+        cells = self.matches.get(key)
+        if cells is None:
+            found = numpy.array([text in key for text in self.texts], dtype=bool)
+            cells = found[self.codes] & self.mask if found.size else numpy.zeros(self.mask.shape, dtype=bool)
+            self.matches[key] = cells
+        return cells
+
+    def get_match_slots(self, match):
+        """Returns a list of (position, token) tuples for the possibilities
+        whose text is in a string or tuple of strings, in the order they're
+        found, as RulePlan.apply would hand them to a rule's apply_slots
+        method.
+
+        :param match: A string or a tuple of strings, like a rule's directives.
+        """
+        key = match if isinstance(match, (str, tuple)) else tuple(match)
+        slots = self.match_slots.get(key)
+        if slots is None:
+            cells = self.get_match(key)
+            rows = numpy.nonzero(cells)[0].tolist()
+            slots = [(i, self.tokens[k]) for i, k in zip(rows, self.token_indexes[cells].tolist())]
+            self.match_slots[key] = slots
+        return slots
+
+    def get_max_scores(self):
+        """Returns an array of the highest score at each position. The
+        values for positions without any possibilities are meaningless."""
+        self.update_scores()
+        if numpy.issubdtype(self.scores.dtype, numpy.floating):
+            lowest = -numpy.inf
+        else:
+            lowest = numpy.iinfo(self.scores.dtype).min
+        filled = numpy.where(self.mask, self.scores, lowest)
+        if not filled.shape[1]:
+            return numpy.full(filled.shape[0], lowest)
+        return filled.max(axis=1)
+
+    def get_high(self):
+        """Returns a boolean array telling which cells hold a possibility
+        with the highest score at its position, like
+        DsToken.get_all_max_score."""
+        max_scores = self.get_max_scores()
+        return self.mask & (self.scores == max_scores[:, None])
+
+    def get_max_indexes(self):
+        """Returns an array of the index in the allowed list of the
+        highest-scoring possibility at each position, or -1 for positions
+        without any. In case of a tie the lowest index is given, like
+        DsToken.get_max_score."""
+        if not self.mask.shape[1]:
+            return numpy.full(self.mask.shape[0], -1, dtype=numpy.intp)
+        indexes = self.get_high().argmax(axis=1)
+        indexes[~self.mask[:, 0]] = -1
+        return indexes
+
+    def get_format_tokens(self):
+        """Returns a list of the highest-scoring possibility at each
+        position, like DsOptions.get_format_tokens."""
+        return [self.options.allowed[i][j] for i, j in enumerate(self.get_max_indexes().tolist()) if j >= 0]
+
+    def process(self, rules, dupe_penalty=-2):
+        """Applies a set of rules and then checks for duplicate directives,
+        like DsOptions.process, and writes the scores back to the DsToken
+        objects.
+
+        :param rules: A set of rule objects, like PatternRule or
+            MutualExclusionRule.
+        :param dupe_penalty: (optional) How the score of duplicate token
+            possibilities should be affected, as judged by
+            penalize_duplicates.
+        """
+        self.apply_rules(rules)
+        if dupe_penalty:
+            self.penalize_duplicates(dupe_penalty)
+        self.update_tokens()
+
+    def apply_rules(self, rules):
+        """Applies all rules in a set in the order they appear, like
+        DsOptions.apply_rules.
+
+        :param rules: A set of rule objects, like PatternRule or
+            MutualExclusionRule.
+        """
+        # Rules applied with the DsToken objects share adjacency bitmasks like they do in DsOptions.apply_rules
+        self.options.adjacent_positions = {}
+        try:
+            for rule in rules:
+                self.apply_rule(rule)
+        finally:
+            self.options.adjacent_positions = None
+
+    def apply_rule(self, rule):
+        """Applies a rule, using the arrays if it's one of the rules
+        DsScoreMatrix.RULE_METHODS has a method for.
+
+        :param rule: A rule object, like PatternRule or MutualExclusionRule.
+        """
+        # Subclasses might not apply the same way
+        apply_rule = DsScoreMatrix.RULE_METHODS.get(type(rule))
+        if apply_rule:
+            apply_rule(self, rule)
+        elif hasattr(rule, 'get_match_groups') and hasattr(rule, 'apply_slots'):
+            slots = [self.get_match_slots(match) for match in rule.get_match_groups()]
+            if any(slots):
+                self.update_tokens()
+                rule.apply_slots(self.options, slots)
+                self.array_current = False
+        else:
+            self.update_tokens()
+            rule.apply(self.options)
+            self.array_current = False
+
+    def apply_delimiter_rule(self, rule):
+        """Applies a DelimiterRule to the scores in the array.
+
+        :param rule: The DelimiterRule object.
+        """
+        present = numpy.zeros(self.mask.shape[0], dtype=bool)
+        for delimiter in rule.delimiters:
+            present |= self.get_match(delimiter).any(axis=1)
+        adjacent = numpy.zeros(self.mask.shape[0], dtype=bool)
+        adjacent[1:] |= present[:-1]
+        adjacent[:-1] |= present[1:]
+        row_scores = numpy.where(adjacent, rule.pos_score, rule.neg_score)
+        self.add_scores(self.get_match(rule.directives) * row_scores[:, None])
+
+    def apply_likely_range_rule(self, rule):
+        """Applies a LikelyRangeRule to the scores in the array.
+
+        :param rule: The LikelyRangeRule object.
+        """
+        cells = self.get_match(rule.directives) & (self.kinds == DsToken.KIND_NUMBER)
+        in_range = numpy.zeros(self.mask.shape[0], dtype=bool)
+        for i in numpy.flatnonzero(cells.any(axis=1)).tolist():
+            num_range = self.options.num_ranges[i]
+            in_range[i] = num_range[0] >= rule.likely_range[0] and num_range[1] <= rule.likely_range[1]
+        row_scores = numpy.where(in_range, rule.pos_score, rule.neg_score)
+        self.add_scores(cells * row_scores[:, None])
+
+    def apply_mutual_exclusion_rule(self, rule):
+        """Applies a MutualExclusionRule to the scores in the array.
+
+        :param rule: The MutualExclusionRule object.
+        """
+        self.update_scores()
+        all_cells = [self.get_match(match_text) for match_text in rule.directives]
+        # Ties go to the lowest-index directive
+        highest_index = None
+        highest_score = None
+        for i, cells in enumerate(all_cells):
+            if cells.any():
+                score = self.scores[cells].max()
+                if highest_index is None or score > highest_score:
+                    highest_index = i
+                    highest_score = score
+        if highest_index is not None:
+            # Possibilities matching several directives are affected once for each, in order
+            for i, cells in enumerate(all_cells):
+                if cells.any():
+                    self.add_scores(cells * (rule.pos_score if i == highest_index else rule.neg_score))
+
+    def penalize_duplicates(self, dupe_penalty):
+        """Handles the presence of duplicate high-scoring directives the
+        same way as DsOptions.penalize_duplicates.
+
+        :param dupe_penalty: How the score of duplicate token possibilities
+            should be affected.
+        """
+        if not self.tokens:
+            return
+        # First: If a possibility is the only high score anywhere,
+        #   reduce its score anywhere it's not the only high score
+        high = self.get_high()
+        high_counts = high.sum(axis=1)
+        solitary = high & (high_counts == 1)[:, None] & (self.kinds != DsToken.KIND_DECORATOR)
+        solitary_codes = numpy.unique(self.codes[solitary])
+        if solitary_codes.size:
+            cells = numpy.isin(self.codes, solitary_codes) & self.mask & (high_counts > 1)[:, None]
+            self.add_scores(cells * dupe_penalty)
+
+        # Second: If a possibility is a high score in more than one place, find its
+        #   highest-scoring instance as a high score (the first found breaks ties)
+        #   and affect the score of that possibility everywhere else
+        rows, columns = numpy.nonzero(self.get_high())
+        codes = self.codes[rows, columns]
+        order = numpy.lexsort((numpy.arange(codes.size), -self.scores[rows, columns], codes))
+        first = numpy.ones(codes.size, dtype=bool)
+        first[1:] = codes[order][1:] != codes[order][:-1]
+        highest = order[first]
+        cells = numpy.isin(self.codes, codes[highest]) & self.mask
+        increments = cells * dupe_penalty
+        increments[rows[highest], columns[highest]] = 0
+        self.add_scores(increments)
+
+    # Rules applied using the arrays, by type
+    RULE_METHODS = {
+        DelimiterRule: apply_delimiter_rule,
+        LikelyRangeRule: apply_likely_range_rule,
+        MutualExclusionRule: apply_mutual_exclusion_rule,
+    }
@@ -0,0 +1,63 @@
+"""Contains DsShapeCache class for DateSense package."""
+from collections import OrderedDict
+
+from .dstoken import DsToken
+
+
+class DsShapeCache(object):
+    """A DsShapeCache object remembers where the tokens are in date strings
+    of a given shape, so that date strings shaped like one seen before can
+    be sliced into token values without being tokenized again. See
+    DsToken.get_shape for what makes two date strings the same shape.
+    The cache holds at most max_size shapes and evicts the least recently
+    used shape when it's full. The hits and misses attributes count how
+    many lookups were answered from the cache and how many weren't.
+    """
+
+    # Default number of shapes to remember
+    DEFAULT_MAX_SIZE = 256
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """Constructs a DsShapeCache object.
+        Returns the DsShapeCache object.
+
+        :param max_size: (optional) The maximum number of shapes to
+            remember. A max_size of 0 disables caching. Defaults to
+            DsShapeCache.DEFAULT_MAX_SIZE.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.spans = OrderedDict()
+
+    def __len__(self):
+        return len(self.spans)
+
+    def get_spans(self, date_string):
+        """Returns the token spans for a date string, the same as
+        DsToken.tokenize_spans() would, using the remembered spans for
+        the date string's shape where there are any.
+
+        :param date_string: The date string to be tokenized.
+        """
+        if not self.max_size:
+            self.misses += 1
+            return DsToken.tokenize_spans(date_string)
+        shape = DsToken.get_shape(date_string)
+        spans = self.spans.get(shape)
+        if spans is not None:
+            self.hits += 1
+            self.spans.move_to_end(shape)
+        else:
+            self.misses += 1
+            spans = DsToken.tokenize_spans(date_string)
+            self.spans[shape] = spans
+            if len(self.spans) > self.max_size:
+                self.spans.popitem(last=False)
+        return spans
+
+    def clear(self):
+        """Forgets all remembered shapes and resets the hit and miss counters."""
+        self.spans.clear()
+        self.hits = 0
+        self.misses = 0
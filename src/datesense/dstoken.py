@@ -1,4 +1,5 @@
 """Contains DsToken class for DateSense package."""
+import re
 
 
 # Used by the parser for keeping track of what goes where, and what can possibly go where
@@ -25,6 +26,32 @@ class DsToken(object):
     # e.g. +0100 or -0300 (You definitely want this value to be 4.)
     TIMEZONE_LENGTH = 4
 
+    # Pattern used to split date strings into tokens. Each alternative is a group so that the kind
+    # of a match can be read from its lastindex. A '+' or '-' only becomes part of a timezone token
+    # when it isn't preceded by a digit and is followed by exactly TIMEZONE_LENGTH digits; lone
+    # '+' and '-' characters are decorator tokens of their own, as are runs of any other characters.
+    TOKEN_PATTERN = re.compile(
+        r'([0-9]+)|([a-zA-Z]+)|([^0-9a-zA-Z+-]+)|((?<![0-9])[+-][0-9]{%d}(?![0-9]))|([+-])' % TIMEZONE_LENGTH
+    )
+
+    # The same pattern for date strings given as bytes, bytearray or memoryview objects.
+    # Only ASCII bytes are ever digits, letters or signs, so every other byte ends up in a decorator.
+    BYTES_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern.encode('ascii'))
+
+    # Encoding used to decode the text of tokens in date strings given as bytes. Bytes that aren't valid
+    # in it, which can only be in decorators, are kept as lone surrogates so different ones stay different.
+    TEXT_ENCODING = 'utf-8'
+    TEXT_ERRORS = 'surrogateescape'
+
+    # Token kind for each group of TOKEN_PATTERN, indexed by the match's lastindex
+    TOKEN_GROUP_KINDS = (None, KIND_NUMBER, KIND_WORD, KIND_DECORATOR, KIND_TIMEZONE, KIND_DECORATOR)
+
+    # Translation table used to compute shape signatures: every digit becomes '0' and every letter
+    # becomes 'a', everything else (including '+' and '-') is left as it is.
+    SHAPE_TABLE = str.maketrans('0123456789' + 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ', '0' * 10 + 'a' * 52)
+    BYTES_SHAPE_TABLE = bytes.maketrans(b'0123456789' + b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+                                        b'0' * 10 + b'a' * 52)
+
     def __init__(self, kind, text, option=None):
         """Constructs a DsToken object.
         You probably want to be using the kind-specific constructors
@@ -125,57 +152,83 @@ class DsToken(object):
         would be tokenized like so: '12', ' ', '34', 'Abc', '?', '+1000'.
         Returns a list of DsToken objects.
 
-        :param date_string: The date string to be tokenized.
+        :param date_string: The date string to be tokenized. May also be a
+            bytes, bytearray or memoryview object, in which case the text
+            of each token is decoded using DsToken.TEXT_ENCODING and
+            DsToken.TEXT_ERRORS.
         """
 
-        current_text = ''
-        current_kind = -1
-        tokens = []
-
-        # Iterate through characters in the date string, divide into tokens and assign token kinds.
+        # The token pattern does the character classification and run splitting in one pass.
         # Digits become number tokens, letters become word tokens, four-digit numbers preceded
         # by '+' or '-' become timezone tokens. Everything else becomes decorator tokens.
-        for char in date_string:
-            asc = ord(char)
-            is_digit = (48 <= asc <= 57)  # 0-9
-            is_alpha = (97 <= asc <= 122) or (65 <= asc <= 90)  # a-zA-Z
-            is_tzoff = (43 == asc or asc == 45)  # +|-
-            tokkind = DsToken.KIND_NUMBER * is_digit + DsToken.KIND_WORD * is_alpha + DsToken.KIND_TIMEZONE * is_tzoff
-            if tokkind == current_kind and current_kind != DsToken.KIND_TIMEZONE:
-                current_text += char
-            else:
-                if current_text:
-                    tokens.append(DsToken(current_kind, current_text))
-                current_kind = tokkind
-                current_text = char
-        if current_text:
-            tokens.append(DsToken(current_kind, current_text))
-
-        # Additional pass for handling timezone tokens
-        ret_tokens = []
-        skip = False
-        tokens_count = len(tokens)
-        for i in range(0, tokens_count):
-            if skip:
-                skip = False
-            else:
-                tok = tokens[i]
-                if tok.is_timezone():
-                    token_previous = tokens[i - 1] if (i > 0) else None
-                    token_next = tokens[i + 1] if (i < tokens_count - 1) else None
-                    check_prev = (not token_previous) or not (
-                                token_previous.is_number() or token_previous.is_timezone())
-                    check_next = (token_next and token_next.is_number() and
-                                  len(token_next.text) == DsToken.TIMEZONE_LENGTH)
-                    if check_prev and check_next:
-                        tok.text += token_next.text
-                        skip = True
-                    else:
-                        tok.kind = DsToken.KIND_DECORATOR
-                ret_tokens.append(tok)
-
-        # All done!
-        return ret_tokens
+        kinds = DsToken.TOKEN_GROUP_KINDS
+        if isinstance(date_string, str):
+            return [DsToken(kinds[match.lastindex], match.group())
+                    for match in DsToken.TOKEN_PATTERN.finditer(date_string)]
+        return [DsToken(kinds[match.lastindex], match.group().decode(DsToken.TEXT_ENCODING, DsToken.TEXT_ERRORS))
+                for match in DsToken.BYTES_TOKEN_PATTERN.finditer(date_string)]
+
+    @staticmethod
+    def iter_spans(date_string):
+        """Tokenizes a date string into spans without creating DsToken
+        objects. Tokens are divided the same way as by tokenize_date.
+        Yields a (kind, start, end) tuple for each token, where
+        date_string[start:end] is the token's text.
+
+        :param date_string: The date string to be tokenized. May also be a
+            bytes, bytearray or memoryview object.
+        """
+        kinds = DsToken.TOKEN_GROUP_KINDS
+        pattern = DsToken.TOKEN_PATTERN if isinstance(date_string, str) else DsToken.BYTES_TOKEN_PATTERN
+        for match in pattern.finditer(date_string):
+            start, end = match.span()
+            yield kinds[match.lastindex], start, end
+
+    @staticmethod
+    def tokenize_spans(date_string):
+        """Tokenizes a date string into spans without creating DsToken
+        objects. Tokens are divided the same way as by tokenize_date.
+        Returns a tuple of (kind, start, end) tuples, one for each token,
+        where date_string[start:end] is the token's text.
+
+        :param date_string: The date string to be tokenized. May also be a
+            bytes, bytearray or memoryview object.
+        """
+        return tuple(DsToken.iter_spans(date_string))
+
+    @staticmethod
+    def get_shape(date_string):
+        """Returns the shape signature of a date string.
+        Tokenizing only depends on whether each character is a digit, a
+        letter, a '+' or '-' or something else, so any two date strings with
+        the same shape signature are tokenized at the same offsets into
+        tokens of the same kinds and with the same decorator text. For
+        example, '15 Dec 2014' and '09 Jan 2015' both have the shape
+        '00 aaa 0000'. The shape of a bytes-like date string is a bytes
+        object, like b'00 aaa 0000'.
+
+        :param date_string: The date string to get the shape of. May also
+            be a bytes, bytearray or memoryview object.
+        """
+        if isinstance(date_string, str):
+            return date_string.translate(DsToken.SHAPE_TABLE)
+        elif isinstance(date_string, bytes):
+            return date_string.translate(DsToken.BYTES_SHAPE_TABLE)
+        else:
+            return bytes(date_string).translate(DsToken.BYTES_SHAPE_TABLE)
+
+    @staticmethod
+    def get_signature(shape):
+        """Returns the token signature for a date string shape, as returned by
+        DsToken.get_shape: a tuple of the kind of each token paired with the
+        text of the token if it's a decorator, or None if it isn't. Date
+        strings with the same token signature can have the same format even
+        if their shapes differ, like '9 Jan 2015' and '16 Oct 2014'.
+
+        :param shape: The shape of a date string.
+        """
+        return tuple((kind, shape[start:end] if kind == DsToken.KIND_DECORATOR else None)
+                     for kind, start, end in DsToken.iter_spans(shape))
 
     # Convenience functions for doing useful operations on sets of token possibilities  
 
@@ -1,7 +1,9 @@
 from collections import namedtuple
+from itertools import chain
 from unittest import TestCase
 
 import datesense
+from datesense.dsengines import BitmaskEngine
 
 Data = namedtuple("Data", "input expected")
 
@@ -14,3 +16,64 @@ class TestDateSense(TestCase):
         for tc in test_casts:
             ds_option = datesense.detect_format(tc.input)
             self.assertEqual(tc.expected, ds_option.get_format_string())
+
+    def test_detect_format_bytes(self):
+        dates = ["Mon Apr 15 14:04:11 2013", "Tue Jan 02 15:20:11 2001", "Fri Oct 25 10:50:13 2013"]
+        expected = datesense.detect_format(dates)
+        for convert in (lambda date: date.encode("ascii"), lambda date: bytearray(date, "ascii"),
+                        lambda date: memoryview(date.encode("ascii"))):
+            options = datesense.detect_format([convert(date) for date in dates])
+            self.assertEqual("%a %b %d %H:%M:%S %Y", options.get_format_string())
+            self.assertEqual(expected.get_long_debug_string(), options.get_long_debug_string())
+            self.assertEqual(expected.num_ranges, options.num_ranges)
+        self.assertEqual("%d %b %Y", datesense.detect_format(b"16 Oct 2014").get_format_string())
+
+    def test_detect_formats(self):
+        dates = ["2014-01-02 10:00", "16 Oct 2014", "2014-01-03 11:30", "", "9 Dec 2015", "2014-12-31 23:59",
+                 "01/02/2014", "12/25/2014"]
+        formats, row_formats = datesense.detect_formats(dates)
+        self.assertEqual(["%Y-%m-%d %H:%M", "%d %b %Y", "", "%m/%d/%Y"],
+                         [options.get_format_string() for options in formats])
+        self.assertEqual([0, 1, 0, 2, 1, 0, 3, 3], list(row_formats))
+        self.assertEqual([3, 2, 1, 2], [options.dates_examined for options in formats])
+        # Each bucket gets the same result as detecting its own rows
+        expected = datesense.detect_format([date for date in dates if date.startswith("2014-")])
+        self.assertEqual(expected.get_long_debug_string(), formats[0].get_long_debug_string())
+
+    def test_detect_formats_max_formats(self):
+        formats, row_formats = datesense.detect_formats(["2014-01-02", "01/02/2014", "2014-01-03"], max_formats=1)
+        self.assertEqual(["%Y-%m-%d"], [options.get_format_string() for options in formats])
+        self.assertEqual([0, datesense.DsOptions.UNKNOWN_FORMAT, 0], list(row_formats))
+
+    def test_detect_formats_messy(self):
+        # Lots of distinct signatures past max_formats are all unknown
+        dates = ["2014-01-02"] + ["2014" + "/" * i for i in range(1, 500)] + ["2014-01-03", "2014//"]
+        formats, row_formats = datesense.detect_formats(dates, max_formats=1)
+        self.assertEqual(1, len(formats))
+        self.assertEqual([0] + [datesense.DsOptions.UNKNOWN_FORMAT] * 499 + [0, datesense.DsOptions.UNKNOWN_FORMAT],
+                         list(row_formats))
+
+    def test_detect_format_iterables(self):
+        dates = ["Mon Apr 15 14:04:11 2013", "Tue Jan 02 15:20:11 2001", "Fri Oct 25 10:50:13 2013"]
+        expected = datesense.detect_format(dates).get_long_debug_string()
+        for iterable in (iter(dates), (date for date in dates), tuple(dates), chain(dates[:1], dates[1:])):
+            options = datesense.detect_format(iterable)
+            self.assertEqual(expected, options.get_long_debug_string())
+            self.assertEqual(3, options.dates_examined)
+        options = datesense.detect_format(iter(dates), seed_scan=2)
+        self.assertEqual(expected, options.get_long_debug_string())
+        options = datesense.detect_format(iter(dates), engine=BitmaskEngine())
+        self.assertEqual(expected, options.get_long_debug_string())
+        self.assertEqual("", datesense.detect_format(iter([])).get_format_string())
+        self.assertEqual("", datesense.detect_format([]).get_format_string())
+
+    def test_detect_format_reads_once(self):
+        read = []
+
+        def generate():
+            for i in range(1, 29):
+                read.append(i)
+                yield "2013-04-%02d" % i
+
+        self.assertEqual("%Y-%m-%d", datesense.detect_format(generate()).get_format_string())
+        self.assertEqual(list(range(1, 29)), read)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import datesense
+from datesense import DsCheckpoint
+from .test_dspartialstate import get_state
+
+
+def generate_dates(count, fail_at=None):
+    for i in range(count):
+        if i == fail_at:
+            raise KeyboardInterrupt()
+        yield "%04d-%02d-%02d %02d:00" % (1990 + i % 30, i % 12 + 1, i % 28 + 1, i % 24)
+
+
+class TestDsCheckpoint(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resume(self):
+        expected = get_state(datesense.detect_format(list(generate_dates(1000))))
+        checkpoint = DsCheckpoint(self.path, 100)
+        with self.assertRaises(KeyboardInterrupt):
+            checkpoint.detect_format(generate_dates(1000, fail_at=450))
+        options, offset = checkpoint.load()
+        self.assertEqual(400, offset)
+        self.assertEqual(400, options.dates_examined)
+        self.assertEqual(expected, get_state(checkpoint.detect_format(generate_dates(1000))))
+        self.assertEqual(1000, checkpoint.load()[1])
+        # No temporary files are left behind
+        self.assertEqual(['checkpoint.json'], os.listdir(self.directory))
+
+    def test_no_checkpoint(self):
+        checkpoint = DsCheckpoint(self.path)
+        self.assertEqual((None, 0), checkpoint.load())
+        self.assertEqual("", checkpoint.detect_format(iter([])).get_format_string())
+        os.remove(self.path)
+        options = DsCheckpoint(self.path).detect_format(generate_dates(10))
+        self.assertEqual("%Y-%m-%d %H:%M", options.get_format_string())
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from unittest import TestCase, skipIf
+
+import datesense
+from datesense.dsengines import BitmaskEngine, NumpyEngine, RegexEngine, SamplingEngine
+from datesense.dsengines.numpy_engine import numpy
+
+
+def generate_dates(date_format, count=50):
+    start = datetime(2001, 1, 2, 15, 20, 11)
+    return [(start + timedelta(days=i * 37, seconds=i * 4099)).strftime(date_format) for i in range(count)]
+
+
+# Sets of dates the engines are checked against the default culling with
+FORMAT_CORPUS = [generate_dates(date_format) for date_format in (
+    "i I %Y", "%m/%d/%y %H:%M", "%a %b %d %H:%M:%S %Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y, %b %d",
+    "%A, %d. %B %Y %I:%M%p", "The day is %d, the month is %B, the time is %I:%M%p", "%Y-%m-%dT%H:%M:%S",
+    "%d.%m.%Y", "%b %B %a %A %p", "%G-W%V-%u", "%G-%j", "%m-%d-%Y", "%Y%m%d", "%Y-%m-%dT%H:%M:%S+0100",
+)]
+IRREGULAR_CORPUS = [
+    ["+0100, -0300, GMT-0900"],
+    ["16 Oct 2014"],
+    ["2001: A Space Odyssey", "2010: The Year We Make Contact"],
+    ["15 Dec 2014", "9 Jan 2015", "31 Mar 2015"],
+    ["2014-01-02", "2014/01/02", "2014-01-03"],
+    ["2014-01-02 10:00", "2014-01-02", "2014-01-02 11:00:00", "02 Jan 2014", ""],
+    [b"2014-01-02 10:00", b"2014-12-31 23:59", b"1999-06-15 07:30"],
+    [b"Mon Apr 15 2013", b"Tue Jan 2 2001", b"Fri Oct 25 2013", b"Sat Oct 5 2013"],
+    ["9 Dec 2015", "16 Oct 2014", "1 Jan 1999", "31 May 2000", "10 Jun 1100"],
+    ["12:00 +0100-0200", "13:00 +0300-0400"],
+    ["+0100-0200", "+0300-0400", "-0500+0600"],
+    [b"2014\xff01\xff02 10\xb700", b"2014\xff12\xff31 23\xb759", b"1999\xfe06\xff15 07\xb730"],
+]
+CORPUS = FORMAT_CORPUS + IRREGULAR_CORPUS
+
+
+def get_state(options):
+    allowed = [[(tok.kind, tok.text, tok.score) for tok in token_list] for token_list in options.allowed]
+    # Ranges only matter where numeric possibilities remain
+    num_ranges = [options.num_ranges[i] if any(tok.is_number() for tok in options.allowed[i]) else None
+                  for i in range(len(options.allowed))]
+    return options.get_format_string(), allowed, num_ranges
+
+
+class EngineTestCase(TestCase):
+    def assertEngineMatches(self, create_engine, corpus=CORPUS):
+        for dates in corpus:
+            expected = get_state(datesense.detect_format(dates))
+            options = datesense.detect_format(dates, engine=create_engine())
+            self.assertEqual(expected, get_state(options), dates)
+            self.assertEqual(len(dates) if isinstance(dates, list) else 1, options.dates_examined)
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class TestNumpyEngine(EngineTestCase):
+    def test_corpus(self):
+        self.assertEngineMatches(NumpyEngine)
+
+    def test_counts(self):
+        engine = NumpyEngine()
+        dates = ["2014-01-02", "2014-01-03", "2014-1-4", "2014-01-0a", "", b"2014-01-05"]
+        options = datesense.detect_format(dates, engine=engine)
+        self.assertEqual(4, engine.vectorized_count)
+        self.assertEqual(2, engine.fallback_count)
+        self.assertEqual(get_state(datesense.detect_format(dates)), get_state(options))
+
+
+class TestBitmaskEngine(EngineTestCase):
+    def test_corpus(self):
+        self.assertEngineMatches(BitmaskEngine)
+
+
+class TestRegexEngine(EngineTestCase):
+    def test_corpus(self):
+        self.assertEngineMatches(RegexEngine, FORMAT_CORPUS + [
+            ["+0100, -0300, GMT-0900"],
+            ["16 Oct 2014"],
+            ["15 Dec 2014", "9 Jan 2015", "31 Mar 2015"],
+            [b"2014-01-02 10:00", b"2014-12-31 23:59", b"1999-06-15 07:30"],
+            ["--0100 5", "-+0200 6"],
+            ["12:00 +0100-0200", "13:00 +0300-0400"],
+            [b"2014\xff01\xff02 10\xb700", b"2014\xff12\xff31 23\xb759", b"1999\xfe06\xff15 07\xb730"],
+        ])
+
+    def test_mismatches(self):
+        engine = RegexEngine(max_mismatched_rows=2)
+        dates = ["2014-01-02", "2014/01/02", "02 Jan 2014", "2014-01-03", "2014--0300"]
+        options = datesense.detect_format(dates, engine=engine)
+        self.assertEqual("%Y-%m-%d", options.get_format_string())
+        self.assertEqual(2, engine.matched_count)
+        self.assertEqual(3, engine.mismatched_count)
+        self.assertEqual([1, 2], engine.mismatched_rows)
+
+    def test_sign_after_timezone(self):
+        engine = RegexEngine()
+        dates = ["+0100-0200", "+0300-0400", "-0500+0600"]
+        options = datesense.detect_format(dates, engine=engine)
+        # Only the last date has a different decorator after its offset
+        self.assertEqual([2], engine.mismatched_rows)
+        self.assertEqual(get_state(datesense.detect_format(dates[:2]))[0], options.get_format_string())
+
+
+class TestSamplingEngine(EngineTestCase):
+    def test_corpus(self):
+        self.assertEngineMatches(SamplingEngine)
+        self.assertEngineMatches(lambda: SamplingEngine(SamplingEngine.STRATIFIED, initial_size=4))
+
+    def test_sample(self):
+        dates = generate_dates("%Y-%m-%d %H:%M:%S", 20000)
+        for mode in (SamplingEngine.UNIFORM, SamplingEngine.STRATIFIED):
+            engine = SamplingEngine(mode, seed=7)
+            options = datesense.detect_format(dates, engine=engine)
+            self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+            self.assertEqual(20000, engine.total_count)
+            self.assertLess(engine.sampled_count, 20000)
+            self.assertEqual(engine.sampled_count, options.dates_examined)
+            self.assertTrue(engine.stable)
+            self.assertLessEqual(engine.violation_bound, 0.01)
+            # The same seed picks the same rows
+            again = SamplingEngine(mode, seed=7)
+            datesense.detect_format(dates, engine=again)
+            self.assertEqual((engine.sampled_count, engine.rounds), (again.sampled_count, again.rounds))
+
+    def test_budget(self):
+        dates = generate_dates("%Y-%m-%d", 5000)
+        engine = SamplingEngine(initial_size=10, max_size=30, max_violation_rate=0.0001)
+        datesense.detect_format(dates, engine=engine)
+        self.assertEqual(30, engine.sampled_count)
+        self.assertEqual(2, engine.rounds)
+
+    def test_inner_engines(self):
+        inner_engines = [RegexEngine, BitmaskEngine] + ([NumpyEngine] if numpy is not None else [])
+        for row in (1, 4):
+            dates = ["05/06/2014"] * 12
+            dates[row] = "25/06/2014"
+            for create_engine in inner_engines:
+                # Every round after the first starts with a row other than the seed
+                engine = SamplingEngine(engine=create_engine(), initial_size=2, max_violation_rate=0.0)
+                options = datesense.detect_format(dates, engine=engine)
+                self.assertEqual(get_state(datesense.detect_format(dates)), get_state(options))
+                self.assertEqual(12, options.dates_examined)
+
+    def test_inner_regex_mismatches(self):
+        # Rounds after the first can start with a row that has more tokens than the seed
+        dates = ["2014-01-02"] + ["2014-01-04 10:00:00"] * 3 + ["2014-01-03", "2014/01/05", "2014-01-31"]
+        inner = RegexEngine()
+        engine = SamplingEngine(engine=inner, initial_size=2, max_violation_rate=0.0)
+        options = datesense.detect_format(dates, engine=engine)
+        self.assertEqual("%Y-%m-%d", options.get_format_string())
+        self.assertEqual(3, inner.matched_count)
+        self.assertEqual(4, inner.mismatched_count)
+
+
+class TestEngineTolerance(TestCase):
+    def setUp(self):
+        self.dates = generate_dates("%Y-%m-%d %H:%M:%S", 200)
+        self.dates[50] = "2013-13-45 14:04:11"
+        self.dates[120] = "2013-04-15 99:04:11"
+        self.expected = datesense.detect_format(self.dates, tolerance=0.01)
+        self.assertIn(120, self.expected.get_violating_rows())
+
+    def assertToleranceMatches(self, engine):
+        options = datesense.detect_format(self.dates, engine=engine, tolerance=0.01)
+        self.assertEqual(self.expected.get_format_string(), options.get_format_string())
+        self.assertEqual(self.expected.get_violating_rows(), options.get_violating_rows())
+
+    def test_regex(self):
+        self.assertToleranceMatches(RegexEngine())
+
+    def test_sampling(self):
+        # Sampling every row over several rounds, so the rows are picked out of order
+        self.assertToleranceMatches(SamplingEngine(initial_size=16, max_violation_rate=0))
+        self.assertToleranceMatches(SamplingEngine(SamplingEngine.STRATIFIED, initial_size=16, max_violation_rate=0))
+
+    def test_unsupported(self):
+        engines = [BitmaskEngine()] + ([NumpyEngine()] if numpy is not None else [])
+        for engine in engines:
+            self.assertRaises(ValueError, datesense.detect_format, self.dates, engine=engine, tolerance=0.01)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from datesense import DsOptions
+from datesense.dslookup import DsLookup
+
+
+class TestDsLookup(TestCase):
+    def setUp(self):
+        self.num_options = DsOptions.get_default_num_options()
+        self.word_options = DsOptions.get_default_word_options() + (
+            DsOptions.WordOption('%A', DsOptions.UNCOMMON, ('sunday', 'monday'), match_length=3),
+        )
+        self.lookup = DsLookup(self.num_options, self.word_options)
+
+    def test_get_num_options(self):
+        for number in list(range(0, 10050)) + [123456]:
+            expected = set(option for option in self.num_options if option.includes_value(number))
+            self.assertEqual(expected, self.lookup.get_num_options(number), number)
+
+    def test_num_ranges_past_table(self):
+        # Ranges reaching past either end of the table are clipped to it
+        num_options = (DsOptions.NumOption('%x', DsOptions.COMMON, (-5, 3)),
+                       DsOptions.NumOption('%y', DsOptions.COMMON, (9990, 20000)),
+                       DsOptions.NumOption('%z', DsOptions.COMMON, (3, 3)))
+        lookup = DsLookup(num_options, ())
+        for number in list(range(-10, 10050)) + [123456]:
+            expected = set(option for option in num_options if option.includes_value(number))
+            self.assertEqual(expected, lookup.get_num_options(number), number)
+
+    def test_get_word_options(self):
+        words = set()
+        for option in self.word_options:
+            for word in option.words:
+                words.update(word[:length] for length in range(1, len(word) + 1))
+        words.update(("", "x", "mondays", "Mon", "MONDA", "Sept", "PM"))
+        for word in words:
+            expected = set(option for option in self.word_options if option.includes_value(word))
+            self.assertEqual(expected, self.lookup.get_word_options(word), word)
+
+    def test_get_lookup(self):
+        lookup = DsLookup.get_lookup(self.num_options, self.word_options)
+        self.assertIs(lookup, DsLookup.get_lookup(list(self.num_options), list(self.word_options)))
+        self.assertIsNot(lookup, DsLookup.get_lookup(self.num_options, self.word_options[1:]))
+        options = DsOptions(DsOptions.get_default_rules(), self.num_options, self.word_options, '%z')
+        self.assertIs(lookup, options.lookup)
+
+    def test_max_lookups(self):
+        lookup = DsLookup.get_lookup(self.num_options, self.word_options)
+        for i in range(DsLookup.MAX_LOOKUPS * 2):
+            DsLookup.get_lookup(self.num_options, (DsOptions.WordOption('%b', DsOptions.COMMON, ('jan',)),))
+            # Recently used lookups are kept
+            self.assertIs(lookup, DsLookup.get_lookup(self.num_options, self.word_options))
+        self.assertEqual(DsLookup.MAX_LOOKUPS, len(DsLookup.lookups))
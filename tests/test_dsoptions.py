@@ -0,0 +1,171 @@
+from unittest import TestCase
+
+from datesense import DsOptions
+from datesense.dsengines import BitmaskEngine
+from datesense.dstoken import DsToken
+
+
+def create_options(shape_cache_size=0):
+    return DsOptions(DsOptions.get_default_rules(), DsOptions.get_default_num_options(),
+                     DsOptions.get_default_word_options(), DsOptions.get_default_tz_offset_directive(),
+                     shape_cache_size)
+
+
+def get_state(options):
+    return [[(tok.kind, tok.text) for tok in token_list] for token_list in options.allowed], options.num_ranges
+
+
+class TestDsOptions(TestCase):
+    DATES = ("2013-04-15 14:04:11", "2001-01-02 15:20:11", "2013-10-25 10:50:13", "2014/1/1 2:00:00 PM",
+             "2013-04-15", "Mon Apr 15 14:04:11 2013")
+
+    def test_cull_with_spans(self):
+        for seed in self.DATES:
+            expected = create_options()
+            expected.init_with_date_tokens(DsToken.tokenize_date(seed))
+            for date in self.DATES:
+                expected.cull_with_date_tokens(DsToken.tokenize_date(date))
+            for shape_cache_size in (0, 1, 256):
+                options = create_options(shape_cache_size)
+                options.init_with_date_tokens(DsToken.tokenize_date(seed))
+                options.cull_with_dates(self.DATES)
+                self.assertEqual(get_state(expected), get_state(options))
+
+    def test_get_distinct_counts(self):
+        options = create_options(256)
+        options.initialize(["2013-04-15", "2013-04-16", "2014-04-16", "2013-04-15", "2013-04-17"])
+        self.assertEqual([2, 1, 1, 1, 3], options.get_distinct_counts())
+
+    def test_max_distinct_values(self):
+        dates = ["2013-04-%02d" % day for day in range(1, 29)]
+        options = create_options(256)
+        options.max_distinct_values = 4
+        options.initialize(dates)
+        self.assertEqual([1, 1, 1, 1, 4], options.get_distinct_counts())
+        expected = create_options(256)
+        expected.initialize(dates)
+        self.assertEqual(get_state(expected), get_state(options))
+
+    def test_early_exit(self):
+        dates = ["%s %s" % (day, month) for day in ("Mon", "Tue", "Wed") for month in ("Apr", "May")] * 100
+        options = create_options(256)
+        options.initialize(dates)
+        self.assertEqual(600, options.dates_examined)
+        self.assertFalse(options.converged)
+        early = create_options(256)
+        early.initialize(dates, early_exit=True)
+        self.assertTrue(early.converged)
+        self.assertEqual(DsOptions.EARLY_EXIT_INTERVAL, early.dates_examined)
+        early.process()
+        options.process()
+        self.assertEqual("%a %b", early.get_format_string())
+        self.assertEqual(options.get_format_string(), early.get_format_string())
+
+    def test_early_exit_equivalent_directives(self):
+        dates = ["Apr %d" % year for year in range(1900, 2100)]
+        # '%Y' and '%G' allow exactly the same values, but the likely range of years might still change
+        options = create_options(256)
+        options.initialize(dates, early_exit=True)
+        self.assertFalse(options.converged)
+        self.assertEqual(200, options.dates_examined)
+        # Without the likely range rule there's nothing left to change
+        options = create_options(256)
+        options.format_rules = (DsOptions.rule_pattern_US_Bd,)
+        options.initialize(dates, early_exit=True)
+        self.assertTrue(options.converged)
+        self.assertEqual(DsOptions.EARLY_EXIT_INTERVAL, options.dates_examined)
+        # Once the years are outside the likely range, they can't come back inside it
+        options = create_options(256)
+        options.initialize(["Apr %d" % year for year in range(3990, 4100)], early_exit=True)
+        self.assertTrue(options.converged)
+
+    def test_early_exit_no_possibilities(self):
+        # Nothing allows both a number and a word at the first position
+        dates = ["2013 Apr", "Mon Apr"] + ["2013 Apr"] * 200
+        options = create_options(256)
+        options.initialize(dates, early_exit=True)
+        self.assertEqual([], options.allowed[0])
+        self.assertFalse(options.is_converged())
+        self.assertFalse(options.converged)
+        self.assertEqual(len(dates), options.dates_examined)
+
+    def test_early_exit_not_converged(self):
+        dates = ["2013-04-15 14:04:11"] * 100
+        options = create_options(256)
+        options.initialize(dates, early_exit=True)
+        self.assertFalse(options.converged)
+        self.assertEqual(100, options.dates_examined)
+
+    def test_tolerance(self):
+        dates = ["2013-04-%02d 14:04:11" % (day % 28 + 1) for day in range(200)]
+        dates[50] = "2013-13-45 14:04:11"
+        dates[120] = "2013-04-15 99:04:11"
+        self.assertNotEqual("%Y-%m-%d %H:%M:%S", DsOptions.detect_format(dates).get_format_string())
+        options = DsOptions.detect_format(dates, tolerance=0.01)
+        self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+        self.assertEqual([50, 120], options.get_violating_rows())
+        # Too many violations still rule a directive out
+        options = DsOptions.detect_format(dates, tolerance=0.001)
+        self.assertNotEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+
+    def test_tolerance_num_ranges(self):
+        dates = ["%02d:%02d" % (i % 60, i * 7 % 60) for i in range(300)]
+        dates[150] = "37:99"
+        options = DsOptions.detect_format(dates, tolerance=0.01)
+        # The violating date string's numbers don't count toward the likely ranges
+        expected = DsOptions.detect_format(dates[:150] + dates[151:])
+        self.assertEqual(expected.get_format_string(), options.get_format_string())
+        self.assertEqual(expected.num_ranges, options.num_ranges)
+        self.assertEqual([150], options.get_violating_rows())
+
+    def test_tolerance_zero(self):
+        for date in self.DATES:
+            dates = list(self.DATES) + [date] * 3
+            expected = create_options()
+            expected.initialize(dates)
+            options = create_options()
+            options.tolerance = 0
+            options.initialize(dates)
+            self.assertEqual(get_state(expected), get_state(options))
+
+    def test_max_violating_rows(self):
+        dates = ["2013-04-15"] + ["2013-13-15"] * 10
+        options = create_options()
+        options.tolerance = 1
+        options.max_violating_rows = 3
+        options.initialize(dates)
+        self.assertEqual([1, 2, 3], options.get_violating_rows())
+
+    def test_time_budget(self):
+        dates = ["2013-04-%02d 14:04:11" % (day % 28 + 1) for day in range(1000)]
+        options = DsOptions.detect_format(dates, time_budget=0)
+        self.assertTrue(options.partial)
+        self.assertEqual(DsOptions.DEADLINE_INTERVAL, options.dates_examined)
+        options = DsOptions.detect_format(dates, time_budget=60)
+        self.assertFalse(options.partial)
+        self.assertEqual(1000, options.dates_examined)
+        self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+
+    def test_engine_unsupported(self):
+        dates = ["2013-04-15"] * 10
+        self.assertRaises(ValueError, DsOptions.detect_format, dates, engine=BitmaskEngine(), time_budget=60)
+        self.assertRaises(ValueError, DsOptions.detect_format, dates, engine=BitmaskEngine(), early_exit=True)
+
+    def test_time_budget_stream(self):
+        dates = iter(["2013-04-15"] * 1000)
+        options = DsOptions.detect_format_stream(dates, time_budget=0)
+        self.assertTrue(options.partial)
+        self.assertEqual(1000 - DsOptions.DEADLINE_INTERVAL, len(list(dates)))
+
+    def test_seed_scan(self):
+        dates = ["date", ""] + ["2013-04-%02d 14:04:11" % (day % 28 + 1) for day in range(100)]
+        dates[60] = "15 Apr 2013"
+        self.assertEqual("", DsOptions.detect_format(dates).get_format_string())
+        for scan in (10, 1000):
+            options = DsOptions.detect_format(dates, seed_scan=scan)
+            self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+            self.assertEqual(3, options.dates_skipped)
+            self.assertEqual(99, options.dates_examined)
+        options = DsOptions.detect_format(dates, seed_scan=10, engine=BitmaskEngine())
+        self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+        self.assertEqual(3, options.dates_skipped)
@@ -0,0 +1,94 @@
+import json
+import random
+from functools import reduce
+from unittest import TestCase
+
+import datesense
+from datesense import DsOptions, DsPartialState
+from .test_dsengines import CORPUS, generate_dates
+
+
+def get_state(options):
+    allowed = [[(tok.kind, tok.text, tok.score) for tok in token_list] for token_list in options.allowed]
+    return options.get_format_string(), allowed, options.num_ranges, options.dates_examined
+
+
+def split(dates, count, rng):
+    cuts = sorted(rng.sample(range(1, len(dates)), min(count, len(dates) - 1)))
+    return [dates[start:end] for start, end in zip([0] + cuts, cuts + [len(dates)])]
+
+
+class TestDsPartialState(TestCase):
+    def assertMergeMatches(self, dates, shards):
+        states = [DsPartialState.from_dates(shard) for shard in shards]
+        try:
+            merged = reduce(DsPartialState.merge, states, DsPartialState())
+        except ValueError:
+            # Shards with fewer token positions than the first can't be merged
+            self.assertTrue(any(len(state) < len(states[0]) for state in states[1:] if not state.is_empty()))
+            return
+        expected = get_state(datesense.detect_format(dates))
+        self.assertEqual(expected, get_state(merged.finalize()), shards)
+        # Merging is associative, where the later states can be merged with each other first
+        if len(states) > 2:
+            try:
+                right = reduce(DsPartialState.merge, states[1:])
+            except ValueError:
+                return
+            self.assertEqual(expected, get_state(states[0].merge(right).finalize()), shards)
+
+    def test_merge(self):
+        rng = random.Random(1)
+        for dates in CORPUS:
+            if isinstance(dates, list) and len(dates) > 1:
+                for count in (1, 2, 5):
+                    self.assertMergeMatches(dates, split(dates, count, rng))
+
+    def test_merge_ranges(self):
+        # Numbers count towards num_ranges only while some directive still allows them
+        dates = ["5", "31", "45", "7", "300", "2"]
+        rng = random.Random(2)
+        for count in range(1, len(dates)):
+            for i in range(10):
+                self.assertMergeMatches(dates, split(dates, count, rng))
+
+    def test_merge_mismatched(self):
+        with self.assertRaises(ValueError):
+            DsPartialState.from_dates(["2014-01-02"]).merge(DsPartialState.from_dates(["16 Oct"]))
+
+    def test_merge_longer(self):
+        # Later shards' extra positions are dropped, like a single pass drops them
+        dates = ["16 Oct", "2014-01-02", "17 Nov 10:00", "18 Dec", "Sep 1"]
+        for i in range(1, len(dates)):
+            self.assertMergeMatches(dates, [dates[:i], dates[i:]])
+        rng = random.Random(3)
+        pools = [generate_dates(date_format) for date_format in ("%d %b", "%Y-%m-%d", "%d %b %H:%M", "%H:%M")]
+        for i in range(100):
+            dates = [rng.choice(rng.choice(pools)) for _ in range(rng.randint(2, 8))]
+            self.assertMergeMatches(dates, split(dates, rng.randint(1, 4), rng))
+
+    def test_from_dates_iterable(self):
+        dates = generate_dates("%Y-%m-%d %H:%M")
+        expected = get_state(DsPartialState.from_dates(dates).finalize())
+        self.assertEqual(expected, get_state(DsPartialState.from_dates(iter(dates)).finalize()))
+        self.assertTrue(DsPartialState.from_dates(iter([])).is_empty())
+
+    def test_empty(self):
+        state = DsPartialState.from_dates(generate_dates("%d.%m.%Y"))
+        self.assertIs(state, state.merge(DsPartialState()))
+        self.assertIs(state, DsPartialState().merge(state))
+        self.assertTrue(DsPartialState.from_dates([]).is_empty())
+        self.assertEqual("", DsPartialState().finalize().get_format_string())
+
+    def test_serialize(self):
+        state = DsPartialState.from_dates(generate_dates("%Y-%m-%dT%H:%M:%S+0100"))
+        copy = DsPartialState.from_dict(json.loads(json.dumps(state.to_dict())))
+        self.assertEqual(get_state(state.finalize()), get_state(copy.finalize()))
+        self.assertEqual(DsPartialState().to_dict(), DsPartialState.from_dict(DsPartialState().to_dict()).to_dict())
+
+    def test_tolerance(self):
+        options = DsOptions(None, DsOptions.get_default_num_options(), DsOptions.get_default_word_options(),
+                            DsOptions.get_default_tz_offset_directive())
+        options.tolerance = 0.1
+        with self.assertRaises(ValueError):
+            DsPartialState.from_options(options)
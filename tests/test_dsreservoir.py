@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+import datesense
+from datesense import DsReservoir
+
+
+def generate_dates(count):
+    start = datetime(2001, 1, 2, 15, 20, 11)
+    for i in range(count):
+        yield (start + timedelta(hours=i * 7)).strftime("%Y-%m-%d %H:%M")
+
+
+class TestDsReservoir(TestCase):
+    def test_add(self):
+        reservoir = DsReservoir(8, 2)
+        for date in ["1 Jan", "10 Jan", "2 Jan", "100 Jan"] * 10:
+            reservoir.add(date)
+        self.assertEqual(40, reservoir.count)
+        self.assertEqual(["1 Jan", "10 Jan"], list(reservoir.shapes.values()))
+        self.assertEqual(6, len(reservoir.samples))
+        self.assertEqual(8, len(reservoir.get_dates()))
+
+    def test_copies_buffers(self):
+        reservoir = DsReservoir(2)
+        buffer = bytearray(b"2014-01-02")
+        reservoir.add(buffer)
+        buffer[0:4] = b"1999"
+        self.assertEqual([b"2014-01-02", b"2014-01-02"], reservoir.get_dates())
+
+    def test_detect_format_stream(self):
+        options = datesense.detect_format_stream(generate_dates(5000), reservoir=DsReservoir(16))
+        self.assertEqual("%Y-%m-%d %H:%M", options.get_format_string())
+        self.assertEqual(5000, options.dates_examined)
+        self.assertEqual(5000, options.reservoir.count)
+        self.assertEqual(1 + 8, len(options.reservoir))
+        expected = datesense.detect_format(list(generate_dates(5000)))
+        self.assertEqual(expected.get_long_debug_string(), options.get_long_debug_string())
+
+    def test_detect_format_stream_empty(self):
+        self.assertEqual("", datesense.detect_format_stream(iter([])).get_format_string())
@@ -0,0 +1,299 @@
+import copy
+import random
+from unittest import TestCase
+
+from datesense import DsOptions
+from datesense.dsrules import DelimiterRule, LikelyRangeRule, MutualExclusionRule, PatternRule, RulePlan
+from datesense.dstoken import DsToken
+from .test_dsengines import CORPUS
+
+DIRECTIVES = ['%d', '%m', '%y', '%Y', '%H', '%I', '%M', '%S', '%b', '%B', '%a', '%p', '%G', '%V', '%j', '%z', '%C',
+              ':', '-', '/', ' ', 'W', 'T', 'd', '%']
+
+
+def apply_pattern_reference(rule, options):
+    # PatternRule.apply as it was before it used an automaton, to check it against
+    arg_index = 0
+    counter = 0
+    ordered_tokens = []
+    ordered_tokens_current = []
+    for token_list in options.allowed:
+        if ordered_tokens_current:
+            counter += 1
+            if counter > rule.max_distance:
+                arg_index = 0
+                counter = 0
+                ordered_tokens_current = []
+        found_token = 0
+        for tok in token_list:
+            if (tok.score >= rule.min_match_score or tok.is_decorator()) and tok.text in rule.sequence[arg_index]:
+                ordered_tokens_current.append(tok)
+                found_token += 1
+        if found_token:
+            arg_index += 1
+            counter = 0
+            if arg_index == len(rule.sequence):
+                arg_index = 0
+                ordered_tokens.extend(ordered_tokens_current)
+    if rule.pos_score:
+        for tok in ordered_tokens:
+            tok.score += rule.pos_score
+    if rule.neg_score:
+        for token_list in options.allowed:
+            for tok in token_list:
+                if not tok.is_decorator():
+                    for match_text in rule.sequence:
+                        if tok.text in match_text:
+                            if tok not in ordered_tokens:
+                                tok.score += rule.neg_score
+
+
+def apply_delimiter_reference(rule, options):
+    # DelimiterRule.apply as it was before it used adjacency bitmasks, to check it against
+    adjacent = []
+    for delimiter in rule.delimiters:
+        tok_list_count = len(options.allowed)
+        for i in range(0, tok_list_count):
+            tok_list = options.allowed[i]
+            delim_tok = DsToken.get_token_with_text(tok_list, delimiter)
+            if delim_tok:
+                if i > 0 and (options.allowed[i - 1] not in adjacent):
+                    adjacent.append(options.allowed[i - 1])
+                if i < tok_list_count - 1 and (options.allowed[i + 1] not in adjacent):
+                    adjacent.append(options.allowed[i + 1])
+    for tok_list in options.allowed:
+        if tok_list in adjacent:
+            if rule.pos_score:
+                for tok in tok_list:
+                    if tok.text in rule.directives:
+                        tok.score += rule.pos_score
+        elif rule.neg_score:
+            for tok in tok_list:
+                if tok.text in rule.directives:
+                    tok.score += rule.neg_score
+
+
+def apply_mutual_exclusion_reference(rule, options):
+    # MutualExclusionRule.apply as it was before it kept a table of the best possibilities, to check it against
+    matched_tokens = []
+    for tok_list in options.allowed:
+        for tok in tok_list:
+            for i in range(0, len(rule.directives)):
+                matched_tokens.append(None)
+                match_text = rule.directives[i]
+                if tok.text in match_text:
+                    if (not matched_tokens[i]) or tok.score > matched_tokens[i].score:
+                        matched_tokens[i] = tok
+    highest_tok = None
+    highest_index = 0
+    for i in range(0, len(matched_tokens)):
+        tok = matched_tokens[i]
+        if tok and ((not highest_tok) or tok.score > highest_tok.score):
+            highest_tok = tok
+            highest_index = i
+    if highest_tok:
+        for tok_list in options.allowed:
+            for tok in tok_list:
+                for i in range(0, len(rule.directives)):
+                    match_text = rule.directives[i]
+                    if tok.text in match_text:
+                        if i == highest_index:
+                            tok.score += rule.pos_score
+                        else:
+                            tok.score += rule.neg_score
+
+
+def apply_reference(rule, options):
+    if isinstance(rule, PatternRule):
+        apply_pattern_reference(rule, options)
+    elif isinstance(rule, DelimiterRule):
+        apply_delimiter_reference(rule, options)
+    elif isinstance(rule, MutualExclusionRule):
+        apply_mutual_exclusion_reference(rule, options)
+    else:
+        rule.apply(options)
+
+
+def create_options(token_lists):
+    options = DsOptions((), DsOptions.get_default_num_options(), DsOptions.get_default_word_options(), '%z')
+    for token_list in token_lists:
+        options.add_position([DsToken(DsToken.KIND_DECORATOR if text[0] != '%' else DsToken.KIND_NUMBER, text)
+                              for text in token_list], [0, 0])
+    return options
+
+
+def get_random_options(rng):
+    options = create_options(rng.sample(DIRECTIVES, rng.randint(0, 4)) for i in range(rng.randint(0, 40)))
+    for i, token_list in enumerate(options.allowed):
+        options.num_ranges[i] = [rng.randint(0, 100), rng.randint(100, 3000)]
+        for tok in token_list:
+            tok.score = rng.randint(-3, 3)
+    return options
+
+
+def get_culled_options(dates):
+    options = DsOptions(DsOptions.get_default_rules(), DsOptions.get_default_num_options(),
+                        DsOptions.get_default_word_options(), DsOptions.get_default_tz_offset_directive())
+    options.initialize(dates)
+    return options
+
+
+def get_scores(options):
+    return [[(tok.kind, tok.text, tok.score) for tok in token_list] for token_list in options.allowed]
+
+
+def get_random_rules(rng):
+    def pick():
+        if rng.random() < 0.3:
+            return rng.choice(DIRECTIVES)
+        return tuple(rng.sample(DIRECTIVES, rng.randint(1, 3)))
+
+    rules = []
+    for i in range(rng.randint(1, 12)):
+        kind = rng.randrange(4)
+        scores = dict(pos_score=rng.randint(-3, 3), neg_score=rng.randint(-3, 3))
+        if kind == 0:
+            rules.append(DelimiterRule(pick(), pick(), **scores))
+        elif kind == 1:
+            low = rng.randint(0, 2000)
+            rules.append(LikelyRangeRule(pick(), (low, low + rng.randint(0, 2000)), **scores))
+        elif kind == 2:
+            rules.append(MutualExclusionRule(tuple(pick() for j in range(rng.randint(1, 4))), **scores))
+        else:
+            rules.append(PatternRule(tuple(pick() for j in range(rng.randint(1, 5))), rng.randint(1, 4),
+                                     rng.randint(-2, 3), **scores))
+    return rules
+
+
+class TestRulePlan(TestCase):
+    def assertPlanMatches(self, options, rules):
+        expected = copy.deepcopy(options)
+        for rule in rules:
+            apply_reference(rule, expected)
+        RulePlan(rules).apply(options)
+        self.assertEqual(get_scores(expected), get_scores(options))
+
+    def test_default_rules(self):
+        for dates in CORPUS:
+            self.assertPlanMatches(get_culled_options(dates), DsOptions.get_default_rules())
+
+    def test_random_rules(self):
+        rng = random.Random(4)
+        states = [get_culled_options(dates) for dates in CORPUS]
+        for i in range(150):
+            self.assertPlanMatches(copy.deepcopy(rng.choice(states)), get_random_rules(rng))
+
+    def test_get_plan(self):
+        rules = DsOptions.get_default_rules()
+        self.assertIs(RulePlan.get_plan(rules), RulePlan.get_plan(list(rules)))
+
+    def test_max_plans(self):
+        rules = DsOptions.get_default_rules()
+        plan = RulePlan.get_plan(rules)
+        for i in range(RulePlan.MAX_PLANS * 2):
+            RulePlan.get_plan((DelimiterRule('%H', ':'),))
+            # Recently used plans are kept
+            self.assertIs(plan, RulePlan.get_plan(rules))
+        self.assertEqual(RulePlan.MAX_PLANS, len(RulePlan.plans))
+
+    def test_other_rules(self):
+        class CountingRule(object):
+            def apply(self, options):
+                self.count = sum(len(token_list) for token_list in options.allowed)
+
+        rule = CountingRule()
+        options = get_culled_options(["2014-01-02"])
+        RulePlan((DsOptions.rule_delim_date, rule)).apply(options)
+        self.assertEqual(sum(len(token_list) for token_list in options.allowed), rule.count)
+
+
+class TestPatternRule(TestCase):
+    def test_random_patterns(self):
+        rng = random.Random(5)
+        for i in range(500):
+            options = get_random_options(rng)
+            rule = PatternRule(tuple(rng.choice(DIRECTIVES + [tuple(rng.sample(DIRECTIVES, 2))])
+                                     for j in range(rng.randint(1, 4))),
+                               rng.randint(1, 3), rng.randint(-2, 2), rng.randint(-3, 3), rng.randint(-3, 3))
+            expected = copy.deepcopy(options)
+            apply_pattern_reference(rule, expected)
+            rule.apply(options)
+            self.assertEqual(get_scores(expected), get_scores(options), rule.sequence)
+
+    def test_found_again(self):
+        # Possibilities matched before the sequence was found count again until the search gives up
+        options = create_options([text] for text in ('%H', ':', '%M', ':', '%M', ' ', ' ', ' ', '%M'))
+        PatternRule((':', '%M'), 1, pos_score=1, neg_score=-1).apply(options)
+        self.assertEqual([0, 2, 2, 1, 1, 0, 0, 0, -1], [token_list[0].score for token_list in options.allowed])
+
+
+class TestDelimiterRule(TestCase):
+    def test_random_delimiters(self):
+        rng = random.Random(6)
+        for i in range(300):
+            options = get_random_options(rng)
+            rule = DelimiterRule(rng.choice(DIRECTIVES + [tuple(rng.sample(DIRECTIVES, 3))]),
+                                 rng.choice(DIRECTIVES + [tuple(rng.sample(DIRECTIVES, 2))]),
+                                 rng.randint(-3, 3), rng.randint(-3, 3))
+            expected = copy.deepcopy(options)
+            apply_delimiter_reference(rule, expected)
+            rule.apply(options)
+            self.assertEqual(get_scores(expected), get_scores(options))
+
+    def test_get_adjacent_positions(self):
+        options = create_options([['%H'], [':'], ['%M'], [' ', ':'], ['%S']])
+        self.assertEqual(0b10101, options.get_adjacent_positions(':'))
+        self.assertEqual(0b10100, options.get_adjacent_positions(' '))
+        self.assertEqual(0, options.get_adjacent_positions('/'))
+        # Bitmasks are only remembered while rules are being applied
+        self.assertIsNone(options.adjacent_positions)
+
+        class RememberingRule(object):
+            def apply(self, options):
+                self.remembered = dict(options.adjacent_positions)
+
+        rule = RememberingRule()
+        options.apply_rules((DelimiterRule('%H', ':'), rule))
+        self.assertEqual({':': 0b10101}, rule.remembered)
+        self.assertIsNone(options.adjacent_positions)
+
+    def test_adjacent_positions_after_culling(self):
+        options = create_options([['%H'], [':'], ['%M']])
+        options.apply_rules((DsOptions.rule_delim_time,))
+        options.add_position([DsToken.create_decorator(':')], [0, 0])
+        options.add_position([DsToken(DsToken.KIND_NUMBER, '%S')], [0, 0])
+        expected = copy.deepcopy(options)
+        apply_delimiter_reference(DsOptions.rule_delim_time, expected)
+        DsOptions.rule_delim_time.apply(options)
+        self.assertEqual(get_scores(expected), get_scores(options))
+
+
+class TestMutualExclusionRule(TestCase):
+    def assertRuleMatches(self, rule, options):
+        expected = copy.deepcopy(options)
+        apply_mutual_exclusion_reference(rule, expected)
+        rule.apply(options)
+        self.assertEqual(get_scores(expected), get_scores(options))
+
+    def test_default_rules(self):
+        rng = random.Random(7)
+        states = [get_culled_options(dates) for dates in CORPUS]
+        rules = [rule for rule in DsOptions.get_default_rules() if isinstance(rule, MutualExclusionRule)]
+        self.assertEqual(6, len(rules))
+        for rule in rules:
+            for state in states:
+                self.assertRuleMatches(rule, copy.deepcopy(state))
+                # Ties and near-ties between the directives
+                options = copy.deepcopy(state)
+                for token_list in options.allowed:
+                    for tok in token_list:
+                        tok.score = rng.randint(-1, 1)
+                self.assertRuleMatches(rule, options)
+
+    def test_random_rules(self):
+        rng = random.Random(8)
+        for i in range(300):
+            rule = MutualExclusionRule(tuple(rng.choice(DIRECTIVES + [tuple(rng.sample(DIRECTIVES, 2))])
+                                             for j in range(rng.randint(1, 4))),
+                                       rng.randint(-3, 3), rng.randint(-3, 3))
+            self.assertRuleMatches(rule, get_random_options(rng))
@@ -0,0 +1,84 @@
+import copy
+import os
+import random
+import subprocess
+import sys
+from unittest import TestCase, skipIf
+
+import datesense
+from datesense import DsOptions, DsScoreMatrix
+from datesense.dsrules import DelimiterRule
+from datesense.dsscorematrix import numpy
+from datesense.dstoken import DsToken
+from .test_dsengines import CORPUS
+from .test_dsrules import get_culled_options, get_random_options, get_random_rules, get_scores
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class TestDsScoreMatrix(TestCase):
+    def assertProcessMatches(self, options, rules, dupe_penalty=-2):
+        expected = copy.deepcopy(options)
+        expected.format_rules = rules
+        expected.process(dupe_penalty)
+        matrix = DsScoreMatrix(options)
+        matrix.process(rules, dupe_penalty)
+        self.assertEqual(get_scores(expected), get_scores(options))
+        self.assertEqual([id(tok) for tok in options.get_format_tokens()],
+                         [id(tok) for tok in matrix.get_format_tokens()])
+        self.assertEqual(expected.get_format_string(), options.get_format_string())
+
+    def test_default_rules(self):
+        for dates in CORPUS:
+            self.assertProcessMatches(get_culled_options(dates), DsOptions.get_default_rules())
+
+    def test_random_rules(self):
+        rng = random.Random(9)
+        states = [get_culled_options(dates) for dates in CORPUS]
+        for i in range(150):
+            self.assertProcessMatches(copy.deepcopy(rng.choice(states)), get_random_rules(rng), rng.randint(-3, 0))
+            self.assertProcessMatches(get_random_options(rng), get_random_rules(rng), rng.randint(-3, 0))
+
+    def test_penalize_duplicates(self):
+        # Small random scores make for plenty of ties
+        rng = random.Random(10)
+        for i in range(300):
+            options = get_random_options(rng)
+            expected = copy.deepcopy(options)
+            expected.penalize_duplicates(-2)
+            matrix = DsScoreMatrix(options)
+            matrix.penalize_duplicates(-2)
+            matrix.update_tokens()
+            self.assertEqual(get_scores(expected), get_scores(options))
+
+    def test_float_scores(self):
+        options = get_culled_options(["2013-04-15 14:04:11", "2001-01-02 15:20:11"])
+        for token_list in options.allowed:
+            for tok in token_list:
+                tok.score += 0.1
+        rules = DsOptions.get_default_rules() + (DelimiterRule(('%H', '%M'), ':', 0.3, -0.7),)
+        self.assertProcessMatches(options, rules)
+
+    def test_get_max_indexes(self):
+        options = get_culled_options(["2013-04-15"])
+        options.allowed.insert(1, [])
+        options.num_ranges.insert(1, None)
+        matrix = DsScoreMatrix(options)
+        expected = [token_list.index(DsToken.get_max_score(token_list)) if token_list else -1
+                    for token_list in options.allowed]
+        self.assertEqual(expected, matrix.get_max_indexes().tolist())
+
+    def test_detect_format(self):
+        for dates in CORPUS:
+            expected = DsOptions.detect_format(dates)
+            options = DsOptions.detect_format(dates, score_matrix=True)
+            self.assertEqual(get_scores(expected), get_scores(options))
+
+
+class TestLazyImport(TestCase):
+    def test_import(self):
+        # numpy is only imported once DsScoreMatrix is needed
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(datesense.__file__)))
+        code = ("import sys, datesense; loaded = 'numpy' in sys.modules; "
+                "datesense.DsScoreMatrix; print(loaded, 'datesense.dsscorematrix' in sys.modules)")
+        output = subprocess.check_output([sys.executable, '-c', code], env=env, universal_newlines=True)
+        self.assertEqual("False True", output.strip())
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+import datesense
+from datesense.dsshapecache import DsShapeCache
+from datesense.dstoken import DsToken
+
+
+class TestDsShapeCache(TestCase):
+    def test_get_shape(self):
+        self.assertEqual("00 aaa 0000", DsToken.get_shape("15 Dec 2014"))
+        self.assertEqual(DsToken.get_shape("15 Dec 2014"), DsToken.get_shape("09 Jan 2015"))
+        self.assertNotEqual(DsToken.get_shape("15 Dec 2014"), DsToken.get_shape("9 Jan 2015"))
+
+    def test_get_spans(self):
+        cache = DsShapeCache()
+        for date in ("15 Dec 2014", "09 Jan 2015", "9 Jan 2015", "2013-04-15T14:04:11+0100"):
+            spans = cache.get_spans(date)
+            tokens = DsToken.tokenize_date(date)
+            self.assertEqual([(tok.kind, tok.text) for tok in tokens],
+                             [(kind, date[start:end]) for kind, start, end in spans])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(3, cache.misses)
+
+    def test_eviction(self):
+        cache = DsShapeCache(2)
+        cache.get_spans("1 Jan")
+        cache.get_spans("10 Jan")
+        cache.get_spans("2 Jan")
+        cache.get_spans("100 Jan")
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.hits)
+        # "10 Jan" was the least recently used shape, so it was evicted
+        cache.get_spans("3 Jan")
+        self.assertEqual(2, cache.hits)
+        cache.get_spans("20 Jan")
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(4, cache.misses)
+
+    def test_disabled(self):
+        cache = DsShapeCache(0)
+        cache.get_spans("1 Jan")
+        cache.get_spans("2 Jan")
+        self.assertEqual(0, len(cache))
+        self.assertEqual(2, cache.misses)
+
+    def test_detect_format(self):
+        dates = ["2013-04-15 14:04:11", "2001-01-02 15:20:11", "2013-10-25 10:50:13"]
+        options = datesense.detect_format(dates)
+        self.assertEqual("%Y-%m-%d %H:%M:%S", options.get_format_string())
+        # The first date is culled with too, so only the first lookup misses
+        self.assertEqual(1, options.shape_cache.misses)
+        self.assertEqual(2, options.shape_cache.hits)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from datesense.dstoken import DsToken
+
+DEC = DsToken.KIND_DECORATOR
+NUM = DsToken.KIND_NUMBER
+WORD = DsToken.KIND_WORD
+TZ = DsToken.KIND_TIMEZONE
+
+
+class TestDsToken(TestCase):
+    def assertTokens(self, date_string, expected):
+        tokens = DsToken.tokenize_date(date_string)
+        self.assertEqual(expected, [(tok.kind, tok.text) for tok in tokens])
+
+    def test_tokenize_date(self):
+        self.assertTokens("12 34Abc?+1000", [
+            (NUM, "12"), (DEC, " "), (NUM, "34"), (WORD, "Abc"), (DEC, "?"), (TZ, "+1000")
+        ])
+        self.assertTokens("", [])
+        self.assertTokens("2014-01-02T15:20", [
+            (NUM, "2014"), (DEC, "-"), (NUM, "01"), (DEC, "-"), (NUM, "02"), (WORD, "T"),
+            (NUM, "15"), (DEC, ":"), (NUM, "20")
+        ])
+
+    def test_tokenize_date_non_ascii(self):
+        self.assertTokens("15 déc. 2014", [
+            (NUM, "15"), (DEC, " "), (WORD, "d"), (DEC, "é"), (WORD, "c"), (DEC, ". "), (NUM, "2014")
+        ])
+
+    def test_tokenize_date_timezones(self):
+        self.assertTokens("+0100, -0300, GMT-0900", [
+            (TZ, "+0100"), (DEC, ", "), (TZ, "-0300"), (DEC, ", "), (WORD, "GMT"), (TZ, "-0900")
+        ])
+        # A sign preceded by a digit, or followed by anything other than exactly four digits, is a decorator
+        self.assertTokens("04-15-2013", [
+            (NUM, "04"), (DEC, "-"), (NUM, "15"), (DEC, "-"), (NUM, "2013")
+        ])
+        self.assertTokens("+01000 -010", [
+            (DEC, "+"), (NUM, "01000"), (DEC, " "), (DEC, "-"), (NUM, "010")
+        ])
+        self.assertTokens("--0100+0200", [
+            (DEC, "-"), (TZ, "-0100"), (DEC, "+"), (NUM, "0200")
+        ])
+        self.assertTokens("a +-", [
+            (WORD, "a"), (DEC, " "), (DEC, "+"), (DEC, "-")
+        ])
+
+    def test_tokenize_spans(self):
+        for date_string in ("12 34Abc?+1000", "", "--0100+0200", "Tue, 15 Apr 2013 14:04:11 -0300"):
+            tokens = DsToken.tokenize_date(date_string)
+            spans = DsToken.tokenize_spans(date_string)
+            self.assertEqual([(tok.kind, tok.text) for tok in tokens],
+                             [(kind, date_string[start:end]) for kind, start, end in spans])
+            self.assertEqual(spans, tuple(DsToken.iter_spans(date_string)))
+
+    def test_tokenize_bytes(self):
+        date_string = "Tue, 15 déc. 2013 14:04:11 -0300"
+        expected = [(tok.kind, tok.text) for tok in DsToken.tokenize_date(date_string)]
+        encoded = date_string.encode("utf-8")
+        for date_bytes in (encoded, bytearray(encoded), memoryview(encoded)):
+            self.assertEqual(expected, [(tok.kind, tok.text) for tok in DsToken.tokenize_date(date_bytes)])
+            self.assertEqual(expected, [(kind, bytes(date_bytes[start:end]).decode("utf-8"))
+                                        for kind, start, end in DsToken.iter_spans(date_bytes)])
+            self.assertEqual(DsToken.get_shape(date_string).encode("utf-8"), DsToken.get_shape(date_bytes))
+
+    def test_tokenize_invalid_bytes(self):
+        # Bytes that aren't valid UTF-8 can only be in decorators, and different ones stay different
+        tokens = DsToken.tokenize_date(b"2014\xff01\xfe02")
+        self.assertEqual([DsToken.KIND_NUMBER, DsToken.KIND_DECORATOR] * 2 + [DsToken.KIND_NUMBER],
+                         [tok.kind for tok in tokens])
+        self.assertEqual(b"\xff", tokens[1].text.encode(DsToken.TEXT_ENCODING, DsToken.TEXT_ERRORS))
+        self.assertNotEqual(tokens[1].text, tokens[3].text)